@@ -0,0 +1,121 @@
+# bench/load.py
+"""
+Load test for omr.server: posts the images of a folder at a fixed
+concurrency and reports sheets/s, request latency and how many requests the
+server turned away (503) or gave up on. With --retry a turned-away request
+is sent again after a short pause, which measures what the server sustains.
+
+    python -m omr.server --fiducials -j 4 --quiet &
+    python -m bench.load scans/ --requests 400 --concurrency 16
+    python -m bench.load scans/ --requests 100 --batch 8 --concurrency 4
+    python -m bench.load scans/ --requests 400 --concurrency 64 --retry
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from omr.batch import collect_images
+
+
+def _post(url, body, content_type, timeout, retry=False):
+    # (status, JSON reply, seconds, 503s retried); latency includes the retries
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                status, payload = resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, None
+        except OSError:
+            status, payload = 0, None  # connection refused / reset / timed out
+        if status != 503 or not retry or time.perf_counter() - start > timeout:
+            return status, payload, time.perf_counter() - start, retries
+        retries += 1
+        time.sleep(0.05)
+
+
+def run(url, images, requests=100, concurrency=8, batch=1, timeout=120.0, retry=False):
+    url = url.rstrip("/")
+    groups = itertools.cycle([images[i:i + batch] for i in range(0, len(images), batch)])
+    bodies = []
+    for _ in range(requests):
+        group = next(groups)
+        if batch == 1:
+            name, data = group[0]
+            bodies.append((f"{url}/grade?student={name}", data, "application/octet-stream"))
+        else:
+            payload = {"images": [{"name": name, "data": base64.b64encode(data).decode("ascii")}
+                                  for name, data in group]}
+            bodies.append((f"{url}/batch", json.dumps(payload).encode(), "application/json"))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        replies = list(pool.map(lambda b: _post(*b, timeout, retry), bodies))
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _, _, _ in replies)
+    ok = [(payload, seconds) for status, payload, seconds, _ in replies if status == 200]
+    sheets = [s for payload, _ in ok for s in (payload["sheets"] if "sheets" in payload else [payload])]
+    ms = np.array([seconds for _, seconds in ok]) * 1000
+    return {"requests": requests, "concurrency": concurrency, "batch": batch,
+            "seconds": round(elapsed, 3),
+            "sheets_per_s": round(len(sheets) / elapsed, 2) if elapsed > 0 else 0.0,
+            "sheets": len(sheets), "found": sum(s["found"] for s in sheets),
+            "latency_ms": {"p50": round(float(np.percentile(ms, 50)), 1) if len(ms) else 0.0,
+                           "p99": round(float(np.percentile(ms, 99)), 1) if len(ms) else 0.0},
+            "statuses": {str(k): v for k, v in sorted(statuses.items())},
+            "retried_503": sum(r for _, _, _, r in replies)}
+
+
+def print_report(report):
+    print(f"{report['requests']} requests x {report['batch']} images, {report['concurrency']} concurrent: "
+          f"{report['sheets_per_s']} sheets/s ({report['sheets']} sheets in {report['seconds']}s, "
+          f"{report['found']} found)")
+    print(f"latency: p50 {report['latency_ms']['p50']} ms, p99 {report['latency_ms']['p99']} ms")
+    print("status:", ", ".join(f"{code} x{n}" for code, n in report["statuses"].items())
+          + (f" ({report['retried_503']} busy replies retried)" if report["retried_503"] else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a running omr.server.")
+    parser.add_argument("source", help="folder, image file or glob pattern of sheets to post")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1, help="images per request (1 uses /grade, more /batch)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--retry", action="store_true", help="send a request again when the server is busy (503)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.source)
+    if not paths:
+        parser.error(f"no images found in {args.source}")
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+
+    report = run(args.url, images, args.requests, args.concurrency, args.batch, args.timeout, args.retry)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not report["sheets"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# bench/run.py
+"""
+Offline benchmark of the grading pipeline on synthetic sheets.
+
+    python -m bench.run --sheets 200
+    python -m bench.run --sheets 200 --json bench.json
+    python -m bench.run --sheets 200 --compare bench.json   # exit 1 on regression
+
+Reports sheets/s, p50/p99 latency per stage, peak memory and detection accuracy.
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.synthetic import LIGHT, build_template, distort, fill_sheet, random_truth
+from omr.buffers import PipelineContext
+from omr.layout import WARP_SIZE, BubbleLayout
+from omr.metrics import Metrics
+from omr.processor import scan_sheet
+
+STAGES = ["preprocess", "fiducials", "contours", "refine", "warp", "threshold", "fill", "grading"]
+SUB_STAGES = ["blur", "canny", "findContours", "rectContour"]  # inside "contours"
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0}
+    ms = np.array(samples) * 1000
+    return {"p50": round(float(np.percentile(ms, 50)), 3), "p99": round(float(np.percentile(ms, 99)), 3)}
+
+
+def run(sheets=100, questions=10, seed=0, warmup=5, distortion=None, full_res=False, fiducials=False,
+        buffers=False):
+    rng = np.random.default_rng(seed)
+    distortion = distortion or {}
+    with tempfile.TemporaryDirectory() as workdir:
+        page, layout_json, answer_key = build_template(workdir, questions, seed)
+    layout = BubbleLayout(layout_json, WARP_SIZE)
+
+    timer = Metrics(window=sheets)
+    totals = []
+    found = 0
+    correct_rows = 0
+    exact_sheets = 0
+    total_rows = 0
+    pool_allocations = 0
+    peak = 0
+    ctx = PipelineContext() if buffers else None
+
+    for i in range(warmup + sheets):
+        truth = random_truth(layout.questions, layout.choices, rng)
+        img = distort(fill_sheet(page, layout_json, truth, rng), rng, **distortion)
+        measured = i >= warmup
+        if i == warmup:
+            tracemalloc.start()
+        if measured:
+            tracemalloc.reset_peak()  # count the pipeline only, not the sheet synthesis
+            before = tracemalloc.get_traced_memory()[0]
+            pool_before = ctx.allocations if ctx is not None else 0
+
+        start = time.perf_counter()
+        result = scan_sheet(img, answer_key, layout, metrics=timer if measured else None,
+                            full_res=full_res, fiducials=fiducials, ctx=ctx)
+        elapsed = time.perf_counter() - start
+        if not measured:
+            continue
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        if ctx is not None:
+            pool_allocations += ctx.allocations - pool_before
+
+        totals.append(elapsed)
+        total_rows += layout.questions
+        if result.found:
+            found += 1
+            hits = int(np.sum(np.asarray(result.answers) == truth))
+            correct_rows += hits
+            exact_sheets += hits == layout.questions
+
+    tracemalloc.stop()
+
+    busy = sum(totals)
+    return {
+        "sheets": sheets,
+        "questions": layout.questions,
+        "sheets_per_second": round(sheets / busy, 2) if busy else 0.0,
+        "latency_ms": {"total": percentiles_ms(totals),
+                       **{name: percentiles_ms(timer.samples[name]) for name in STAGES + SUB_STAGES}},
+        "memory": {"per_sheet_peak_mb": round(peak / 2 ** 20, 2),
+                   "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                   "buffer_allocations_per_sheet": round(pool_allocations / sheets, 3) if buffers else None},
+        "accuracy": {"sheets_found": round(found / sheets, 4),
+                     "rows_correct": round(correct_rows / total_rows, 4),
+                     "sheets_exact": round(exact_sheets / sheets, 4)},
+    }
+
+
+def print_report(report):
+    print(f"{report['sheets']} sheets x {report['questions']} questions: "
+          f"{report['sheets_per_second']} sheets/s")
+    print(f"{'stage':<12}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, p in report["latency_ms"].items():
+        print(f"{name:<12}{p['p50']:>10.3f}{p['p99']:>10.3f}")
+    mem = report["memory"]
+    print(f"memory: per-sheet peak {mem['per_sheet_peak_mb']} MB, max RSS {mem['max_rss_mb']} MB"
+          + (f", {mem['buffer_allocations_per_sheet']} buffer allocations/sheet"
+             if mem.get("buffer_allocations_per_sheet") is not None else ""))
+    acc = report["accuracy"]
+    print(f"accuracy: found {acc['sheets_found']:.2%}, rows {acc['rows_correct']:.2%}, "
+          f"exact sheets {acc['sheets_exact']:.2%}")
+
+
+def compare(report, baseline, tolerance):
+    """Regression messages against a saved report (empty list = OK)."""
+    problems = []
+    if report["sheets_per_second"] < baseline["sheets_per_second"] * (1 - tolerance):
+        problems.append(f"throughput {report['sheets_per_second']} < baseline {baseline['sheets_per_second']}")
+    for key, value in report["accuracy"].items():
+        if value < baseline["accuracy"][key] - 0.005:
+            problems.append(f"accuracy.{key} {value} < baseline {baseline['accuracy'][key]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the OMR pipeline on synthetic sheets.")
+    parser.add_argument("--sheets", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--blur", type=float, default=1.2)
+    parser.add_argument("--noise", type=float, default=6.0)
+    parser.add_argument("--light", type=float, default=LIGHT, help="strength of the lighting gradient")
+    parser.add_argument("--jpeg", type=int, default=75, help="JPEG quality, 0 disables")
+    parser.add_argument("--full-res", action="store_true",
+                        help="coarse-to-fine localization (about 1.6x the time per sheet)")
+    parser.add_argument("--fiducials", action="store_true", help="locate the sheet by its corner markers")
+    parser.add_argument("--buffers", action="store_true", help="reuse preallocated working images (omr.buffers)")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="baseline report; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed throughput drop")
+    args = parser.parse_args(argv)
+
+    report = run(args.sheets, args.questions, args.seed,
+                 distortion={"blur": args.blur, "noise": args.noise, "light": args.light,
+                             "jpeg_quality": args.jpeg}, full_res=args.full_res, fiducials=args.fiducials,
+                 buffers=args.buffers)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION:", p)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench/synthetic.py
+"""
+Synthetic OMR sheets with a known ground truth: the real generate_omr_sheet page,
+bubbles filled programmatically, then photographed-looking distortions.
+"""
+import json
+import os
+import random
+
+import cv2
+import numpy as np
+
+from omr.utlis import LETTER_TO_INDEX
+from teacher.generate_sheet import generate_omr_sheet
+
+PRINTED_OPTIONS = ["A", "B", "C", "D"]  # generate_omr_sheet prints four bubbles per question
+# default lighting gradient: the far side of the frame gets 25% less light. From
+# about 0.3 up hardly any sheet is read exactly, which leaves bench.run --compare
+# no accuracy to lose; try --light 0.35 to see how the bubble reading copes.
+LIGHT = 0.25
+
+
+def make_questions(n, seed=0):
+    rnd = random.Random(seed)
+    return [{"q_no": i,
+             "text": f"Synthetic question {i}",
+             "choices": {c: f"option {c}" for c in ["A", "B", "C", "D", "E"]},
+             "answer": rnd.choice(PRINTED_OPTIONS)}
+            for i in range(1, n + 1)]
+
+
+def build_template(workdir, n_questions=10, seed=0):
+    """
+    Generate a blank sheet into workdir. Returns (page BGR, layout, answer_key).
+    Nothing under data/ or assets/ is touched.
+    """
+    questions = make_questions(n_questions, seed)
+    paths = {name: os.path.join(workdir, name)
+             for name in ("questions.json", "layout.json", "printed_order.json", "sheet.png")}
+    with open(paths["questions.json"], "w", encoding="utf-8") as f:
+        json.dump(questions, f)
+    layout = generate_omr_sheet(paths["sheet.png"], questions_file=paths["questions.json"],
+                                layout_file=paths["layout.json"], printed_order_file=paths["printed_order.json"])
+    page = cv2.imread(paths["sheet.png"])
+    q_by_no = {q["q_no"]: q for q in questions}
+    answer_key = {e["original_q_no"]: LETTER_TO_INDEX[q_by_no[e["original_q_no"]]["answer"]] for e in layout}
+    return page, layout, answer_key
+
+
+def random_truth(questions, choices, rng, blank_rate=0.05, multi_rate=0.05):
+    """Choice index per printed row; -2 leaves the row blank and -1 marks two bubbles."""
+    truth = rng.integers(0, choices, questions)
+    roll = rng.random(questions)
+    truth[roll < blank_rate] = -2
+    truth[(roll >= blank_rate) & (roll < blank_rate + multi_rate)] = -1
+    return truth
+
+
+def fill_sheet(page, layout, truth, rng):
+    """Pencil-like marks on a copy of the blank page following truth."""
+    page = page.copy()
+    rows = sorted(layout, key=lambda e: e["printed_index"])
+    for entry, answer in zip(rows, truth):
+        rects = [entry["options"][o] for o in entry["options"]]
+        if answer == -2:
+            continue
+        picks = [answer] if answer >= 0 else rng.choice(len(rects), 2, replace=False)
+        for c in picks:
+            x, y, w, h = rects[c]
+            shade = int(rng.integers(20, 90))
+            radius = max(int(w / 2 * rng.uniform(0.8, 1.0)), 2)
+            cv2.circle(page, (x + w // 2, y + h // 2), radius, (shade, shade, shade), cv2.FILLED)
+    return page
+
+
+def distort(page, rng, canvas=(1200, 1600), max_angle=6, jitter=0.03, blur=1.2, noise=6.0,
+            light=LIGHT, jpeg_quality=75):
+    """Perspective + rotation onto a desk, blur, sensor noise, a lighting gradient, JPEG."""
+    H, W = page.shape[:2]
+    cw, ch = canvas
+    scale = min(cw / W, ch / H) * rng.uniform(0.75, 0.9)
+    angle = np.deg2rad(rng.uniform(-max_angle, max_angle))
+    rot = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    src = np.float32([[0, 0], [W, 0], [0, H], [W, H]])
+    dst = (src - (W / 2, H / 2)) * scale @ rot.T + (cw / 2, ch / 2)
+    dst += rng.uniform(-jitter, jitter, (4, 2)) * (W * scale, H * scale)
+    M = cv2.getPerspectiveTransform(src, np.float32(dst))
+
+    desk = np.full((ch, cw, 3), int(rng.integers(25, 60)), np.uint8)
+    img = cv2.warpPerspective(page, M, (cw, ch), dst=desk, borderMode=cv2.BORDER_TRANSPARENT)
+
+    # lighting falls off across the frame in a random direction
+    theta = rng.uniform(0, 2 * np.pi)
+    yy, xx = np.mgrid[0:ch, 0:cw].astype(np.float32)
+    ramp = (xx / cw - 0.5) * np.cos(theta) + (yy / ch - 0.5) * np.sin(theta)
+    gain = 1.0 - light * (ramp + 0.5)
+    img = img.astype(np.float32) * gain[..., None]
+
+    if noise:
+        img += rng.normal(0, noise, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    if blur:
+        img = cv2.GaussianBlur(img, (0, 0), blur)
+    if jpeg_quality:
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    return img
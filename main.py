@@ -1,14 +1,26 @@
 # main.py
-import tkinter as tk
-from tkinter import messagebox
-from teacher.panel import TeacherPanel
-from student.panel import StudentPanel
+"""
+Launcher. The panels (and through them pandas, cv2 and numpy) are imported
+when their button is pressed, so the window shows up without them.
+
+    python main.py                     # the launcher
+    python main.py --startup-report    # time to the launcher window, heavy modules loaded by then,
+                                       # and the cost of each deferred import; then exit
+    python -X importtime main.py       # Python's own per-module import trace
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import importlib
 import os
+import sys
+import tkinter as tk
 
-# Ensure required directories exist
-os.makedirs("data", exist_ok=True)
-os.makedirs("results", exist_ok=True)
-os.makedirs("assets", exist_ok=True)
+# modules the launcher must not load before a panel is opened
+HEAVY_MODULES = ["cv2", "numpy", "pandas", "PIL", "openpyxl"]
+DEFERRED_IMPORTS = ["teacher.panel", "student.panel", "numpy", "cv2", "pandas", "PIL.Image",
+                    "omr.processor", "student.records", "teacher.importer", "teacher.generate_sheet"]
 
 
 class MainApp:
@@ -26,12 +38,14 @@ class MainApp:
         tk.Button(root, text="OMR Check", width=20, command=self.open_student_panel).pack(pady=10)
 
     def open_teacher_panel(self):
+        from teacher.panel import TeacherPanel
         self.root.destroy()
         root2 = tk.Tk()
         TeacherPanel(root2, go_back_callback=self.restart_main)
         root2.mainloop()
 
     def open_student_panel(self):
+        from student.panel import StudentPanel
         self.root.destroy()
         root2 = tk.Tk()
         StudentPanel(root2, go_back_callback=self.restart_main)
@@ -43,7 +57,31 @@ class MainApp:
         root.mainloop()
 
 
+def startup_report(root):
+    """Print how long the launcher took to draw, which heavy modules it pulled in, and what each deferred import costs."""
+    root.update()
+    ready = time.perf_counter() - _T0
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"⏱ launcher ready in {ready * 1000:.0f} ms")
+    print(f"   heavy modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+    for name in DEFERRED_IMPORTS:
+        already = name in sys.modules
+        t = time.perf_counter()
+        importlib.import_module(name)
+        cost = (time.perf_counter() - t) * 1000
+        print(f"   import {name:<24} {'(already loaded)' if already else f'{cost:7.0f} ms'}")
+    root.destroy()
+    return 1 if loaded else 0
+
+
 if __name__ == "__main__":
+    # Ensure required directories exist
+    os.makedirs("data", exist_ok=True)
+    os.makedirs("results", exist_ok=True)
+    os.makedirs("assets", exist_ok=True)
+
     root = tk.Tk()
     MainApp(root)
+    if "--startup-report" in sys.argv[1:]:
+        sys.exit(startup_report(root))
     root.mainloop()
@@ -0,0 +1,207 @@
+# omr/bank.py
+"""
+SQLite question bank (data/questions.db), replacing the rewrite-everything
+data/questions.json.
+
+Saving N new questions is N inserts in one transaction; q_no is the primary
+key and tags are indexed, so the student panel and the answer-key loaders
+read only the questions they print. questions.json stays the interchange
+format: import_json / export_json, and the legacy file is imported once
+when the bank is first created.
+"""
+import json
+import os
+import sqlite3
+
+BANK_PATH = "data/questions.db"
+QUESTIONS_JSON = "data/questions.json"
+CHOICES = ["A", "B", "C", "D", "E"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    q_no    INTEGER PRIMARY KEY,
+    text    TEXT NOT NULL,
+    a       TEXT NOT NULL,
+    b       TEXT NOT NULL,
+    c       TEXT NOT NULL,
+    d       TEXT NOT NULL,
+    e       TEXT NOT NULL,
+    answer  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS question_tags (
+    tag     TEXT NOT NULL,
+    q_no    INTEGER NOT NULL REFERENCES questions(q_no) ON DELETE CASCADE,
+    PRIMARY KEY (tag, q_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_question_tags_q_no ON question_tags(q_no);
+"""
+
+_COLUMNS = "q.q_no, q.text, q.a, q.b, q.c, q.d, q.e, q.answer"
+_MAX_PARAMS = 500  # q_nos per IN (...) query, well under SQLite's variable limit
+
+
+class QuestionBank:
+    """Add / look up / export questions as the dicts questions.json holds ({"q_no", "text", "choices", "answer"[, "tags"]})."""
+
+    def __init__(self, path=BANK_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- writes ----
+    def add_many(self, questions):
+        """
+        Append questions after the highest q_no in one transaction. Each dict's
+        q_no is set to the number it was stored under; returns those numbers.
+        """
+        with self.conn:
+            start = self.next_q_no()
+            for q_no, q in enumerate(questions, start=start):
+                q["q_no"] = q_no
+            self._write(questions)
+        return [q["q_no"] for q in questions]
+
+    def import_questions(self, questions):
+        """Store questions under their own q_no, replacing any question with the same number."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM question_tags WHERE q_no = ?", [(int(q["q_no"]),) for q in questions])
+            self._write(questions, "INSERT OR REPLACE")
+
+    def _write(self, questions, verb="INSERT"):
+        self.conn.executemany(
+            f"{verb} INTO questions(q_no, text, a, b, c, d, e, answer) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(int(q["q_no"]), q["text"], *(q["choices"].get(c, "") for c in CHOICES), q["answer"])
+             for q in questions])
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO question_tags(tag, q_no) VALUES (?, ?)",
+            [(tag, int(q["q_no"])) for q in questions for tag in q.get("tags", ())])
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM questions")
+
+    # ---- reads ----
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def next_q_no(self):
+        return self.conn.execute("SELECT COALESCE(MAX(q_no), 0) + 1 FROM questions").fetchone()[0]
+
+    def get(self, q_no):
+        found = self.get_many([q_no])
+        return found.get(int(q_no))
+
+    def get_many(self, q_nos):
+        """{q_no: question} for the numbers that exist, by primary key."""
+        q_nos = [int(q) for q in q_nos]
+        rows = []
+        for i in range(0, len(q_nos), _MAX_PARAMS):
+            part = q_nos[i:i + _MAX_PARAMS]
+            rows += self.conn.execute(
+                f"SELECT {_COLUMNS} FROM questions q WHERE q.q_no IN ({','.join('?' * len(part))})", part).fetchall()
+        return {q["q_no"]: q for q in self._questions(rows)}
+
+    def by_tag(self, tag):
+        rows = self.conn.execute(f"SELECT {_COLUMNS} FROM question_tags t JOIN questions q ON q.q_no = t.q_no "
+                                 "WHERE t.tag = ? ORDER BY q.q_no", (tag,)).fetchall()
+        return self._questions(rows)
+
+    def tags(self):
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT tag FROM question_tags ORDER BY tag")]
+
+    def questions(self, limit=None, offset=0):
+        """Questions in q_no order, one page at a time when limit is given."""
+        sql = f"SELECT {_COLUMNS} FROM questions q ORDER BY q.q_no"
+        params = []
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = [int(limit), int(offset)]
+        return self._questions(self.conn.execute(sql, params).fetchall())
+
+    def answers(self, q_nos=None):
+        """{q_no: letter} without reading the question texts; every question when q_nos is None."""
+        if q_nos is None:
+            return dict(self.conn.execute("SELECT q_no, answer FROM questions ORDER BY q_no").fetchall())
+        q_nos = [int(q) for q in q_nos]
+        out = {}
+        for i in range(0, len(q_nos), _MAX_PARAMS):
+            part = q_nos[i:i + _MAX_PARAMS]
+            out.update(self.conn.execute(
+                f"SELECT q_no, answer FROM questions WHERE q_no IN ({','.join('?' * len(part))})", part).fetchall())
+        return out
+
+    def _questions(self, rows):
+        tags = {}
+        if rows:
+            q_nos = [r[0] for r in rows]
+            for i in range(0, len(q_nos), _MAX_PARAMS):
+                part = q_nos[i:i + _MAX_PARAMS]
+                for tag, q_no in self.conn.execute(
+                        f"SELECT tag, q_no FROM question_tags WHERE q_no IN ({','.join('?' * len(part))})", part):
+                    tags.setdefault(q_no, []).append(tag)
+        out = []
+        for q_no, text, *choices, answer in rows:
+            q = {"q_no": q_no, "text": text, "choices": dict(zip(CHOICES, choices)), "answer": answer}
+            if q_no in tags:
+                q["tags"] = sorted(tags[q_no])
+            out.append(q)
+        return out
+
+    # ---- questions.json ----
+    def import_json(self, json_path=QUESTIONS_JSON):
+        """Import a questions.json (keeping its q_no values). Returns the number imported."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+        self.import_questions(questions)
+        return len(questions)
+
+    def export_json(self, json_path=QUESTIONS_JSON):
+        """Write the whole bank as questions.json for older tools. Returns the number exported."""
+        questions = self.questions()
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(questions, f, indent=2, ensure_ascii=False)
+        return len(questions)
+
+
+def open_bank(path=BANK_PATH, legacy_json=QUESTIONS_JSON):
+    """Open the bank, importing the legacy questions.json the first time the database is created."""
+    fresh = not os.path.exists(path)
+    bank = QuestionBank(path)
+    if fresh and legacy_json and os.path.exists(legacy_json):
+        try:
+            bank.import_json(legacy_json)
+        except ValueError:  # unreadable legacy file: start empty
+            pass
+    return bank
+
+
+def load_questions(path=None):
+    """Every question from a questions.json path, or from the bank (path None or a .db file)."""
+    if path is not None and not path.endswith(".db"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    with open_bank(path or BANK_PATH) as bank:
+        return bank.questions()
+
+
+def load_answers(path=None, q_nos=None):
+    """{q_no: letter} for q_nos (all when None), from a questions.json or the bank."""
+    if path is not None and not path.endswith(".db"):
+        answers = {q["q_no"]: q["answer"] for q in load_questions(path)}
+        return answers if q_nos is None else {q: answers[q] for q in q_nos if q in answers}
+    with open_bank(path or BANK_PATH) as bank:
+        return bank.answers(q_nos)
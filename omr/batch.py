@@ -0,0 +1,296 @@
+# omr/batch.py
+"""
+Headless batch grading of scanned OMR sheets (no Tk, no camera).
+
+    python -m omr.batch scans/                 # every image in a folder
+    python -m omr.batch "scans/*.jpg" -o results/batch.csv -j 8
+    python -m omr.batch old_scans/ --legacy-grid      # sheets without a layout (5x5 grid)
+
+One row is written per sheet; the student name is the image file name. The
+bubbles are read through data/layout.json (-l) when it exists.
+"""
+import argparse
+import csv
+import glob
+import os
+import itertools
+import signal
+import time
+from contextlib import nullcontext
+from multiprocessing import get_context
+
+import cv2
+
+from omr import metrics as omr_metrics
+from omr import utlis
+from omr.buffers import PipelineContext
+from omr.cache import CACHE_PATH, ScanCache, config_version, file_digest
+from omr.export import check_writer, columns_from_rows, write_columns
+from omr.grading import CohortGrader, item_report
+from omr.layout import load_layout
+from omr.loader import PrefetchLoader, read_image
+from omr.store import DB_PATH, DEFAULT_EXAM, open_store
+from omr.processor import scan_sheet
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+_answer_key = None
+_layout = None
+_full_res = False
+_fiducials = False
+_ctx = None
+
+
+def collect_images(source):
+    # a folder, a single file or a glob pattern
+    if os.path.isdir(source):
+        paths = [os.path.join(source, f) for f in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTS))
+
+
+def _configure(answer_key, layout_path=None, full_res=False, fiducials=False):
+    global _answer_key, _layout, _full_res, _fiducials, _ctx
+    _answer_key = answer_key
+    _ctx = PipelineContext()  # reused by every sheet this process grades
+    _full_res = full_res
+    _fiducials = fiducials
+    _layout = load_layout(layout_path) if layout_path else None  # compiled once per process
+
+
+def _init_worker(answer_key, layout_path=None, with_metrics=False, full_res=False, fiducials=False):
+    _configure(answer_key, layout_path, full_res, fiducials)
+    omr_metrics.active = omr_metrics.Metrics() if with_metrics else None  # drained back per sheet
+    cv2.setNumThreads(1)  # one sheet per core, don't let OpenCV oversubscribe
+
+
+def _init_service_worker(*args):
+    # long-running pools (omr.watch, omr.server): Ctrl+C reaches the whole
+    # process group, only the parent should handle it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(*args)
+
+
+def _outcome(result):
+    # (answers, score) as written to the CSV; score is -1 without a sheet
+    if not result.found:
+        return {}, -1
+    return result.letters(), (result.score / 100) * len(_answer_key)
+
+
+def grade_image(img, name="sheet"):
+    """
+    (answers, score, ScanResult) of one decoded image. An image that couldn't
+    be decoded, or that made the pipeline raise, comes back as ({}, -1, None)
+    so one bad sheet doesn't end the batch.
+    """
+    if img is None:
+        return {}, -1, None
+    try:
+        result = scan_sheet(img, _answer_key, _layout, full_res=_full_res, fiducials=_fiducials, ctx=_ctx)
+    except Exception as e:
+        print(f"❌ Error grading {name}: {e!r}")
+        if omr_metrics.active is not None:
+            omr_metrics.active.count("errors")
+        return {}, -1, None
+    return (*_outcome(result), result)
+
+
+def grade_file(path):
+    """Grade one image file inside a worker. Returns (path, answers, score, ScanResult, metrics samples)."""
+    metrics = omr_metrics.active
+    with metrics.stage("decode") if metrics is not None else nullcontext():
+        img = read_image(path, _full_res)
+    answers, score, result = grade_image(img, path)
+    return path, answers, score, result, metrics.drain() if metrics is not None else None
+
+
+def _grade_prefetched(paths, max_bytes):
+    # -j 1: grade in this process while the next files are decoded on threads
+    for path, img in PrefetchLoader(paths, max_bytes=max_bytes, full_res=_full_res):
+        yield (path, *grade_image(img, path), None)
+
+
+def run_batch(paths, answer_key, out_path, workers=None, chunksize=4, layout_path=None, full_res=False,
+              fiducials=False, prefetch_bytes=256 * 2 ** 20, exam=None, db_path=DB_PATH, cache=None,
+              progress=None, cohort=None, start_method=None):
+    """
+    Grade paths into a CSV at out_path. With an exam name the sheets are also
+    recorded in the results store, fill matrices included, so omr.regrade can
+    grade them again later. With an omr.cache.ScanCache, files seen before with
+    the same settings are only hashed; the rest go to the workers. An out_path
+    ending in .parquet or .npz gets typed columns (omr.export) instead of CSV rows.
+    progress(done, total_sheets, elapsed) is called after every sheet. Every
+    found sheet is also added to cohort (an omr.grading.CohortGrader) if given.
+    start_method picks how the worker processes start ("spawn" when called
+    from a thread of a GUI process, which must not be forked); None is the
+    platform default.
+    """
+    columnar = out_path.lower().endswith((".parquet", ".npz"))
+    if columnar:
+        check_writer(out_path)  # a missing pyarrow shows up now, not after the whole batch
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    total = len(answer_key)
+    failed = 0
+    metrics = omr_metrics.active
+    store = open_store(db_path) if exam is not None else None
+    stored = []
+    rows = []
+
+    start = time.perf_counter()
+    _configure(answer_key, layout_path, full_res, fiducials)
+    todo = paths
+    hits = []
+    keys = {}
+    cached = set()
+    if cache is not None:
+        config = config_version(_layout, total, full_res, fiducials)
+        todo = []
+        for path in paths:
+            keys[path] = cache.key(file_digest(path), config)
+            result = cache.get(keys[path])
+            if result is None:
+                todo.append(path)
+            else:
+                if result.found:  # a cached miss has nothing to grade, it is reported as failed again
+                    result.grade(answer_key)
+                hits.append((path, *_outcome(result), result, None))
+                cached.add(path)
+
+    inline = workers == 1 or not todo  # no pool to start when everything was cached
+    processes = get_context(start_method)
+    with (nullcontext() if columnar else open(out_path, "w", newline="", encoding="utf-8")) as f, \
+            (nullcontext() if inline else processes.Pool(workers, initializer=_init_worker,
+                                                         initargs=(answer_key, layout_path, metrics is not None,
+                                                                   full_res, fiducials))) as pool:
+        if inline:
+            graded = _grade_prefetched(todo, prefetch_bytes)
+        else:
+            graded = pool.imap_unordered(grade_file, todo, chunksize=chunksize)
+        graded = itertools.chain(hits, graded)
+        if not columnar:
+            writer = csv.writer(f)
+            writer.writerow(["Student Name", "Answers", "Score", "Total"])
+        for done, (path, answers, score, result, samples) in enumerate(graded, start=1):
+            if samples is not None:
+                metrics.merge(samples)
+            if score == -1:
+                failed += 1
+                print(f"⚠️ No OMR Sheet detected: {path}")
+            student_id = os.path.splitext(os.path.basename(path))[0]
+            if columnar:
+                rows.append((student_id, answers, score, total))
+            else:
+                writer.writerow([student_id, str(answers), score, total])
+            if cache is not None and result is not None and path not in cached:
+                cache.put(keys[path], result)
+            if cohort is not None and score != -1:
+                cohort.add_result(result)
+            if store is not None and score != -1:
+                stored.append((student_id, answers, score, total, result))
+                if len(stored) >= 200:
+                    store.insert_many(stored, exam)
+                    stored = []
+            if progress is not None:
+                progress(done, len(paths), time.perf_counter() - start)
+    if columnar:
+        write_columns(out_path, columns_from_rows(rows, list(answer_key)))
+    if store is not None:
+        store.insert_many(stored, exam)
+        store.close()
+    elapsed = time.perf_counter() - start
+
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(f"✅ Graded {len(paths)} sheets ({failed} failed) in {elapsed:.2f}s - {rate:.1f} sheets/s"
+          + (f", {len(cached)} from cache" if cache is not None else ""))
+    print(f"Results saved to {out_path}")
+    if metrics is not None:
+        metrics.count("cache_hits", len(cached))
+        metrics.flush()
+    return rate
+
+
+def add_grading_args(parser):
+    """
+    Options every headless grader shares (omr.batch, omr.watch, omr.server):
+    answer key, layout, detection and the results database.
+    """
+    parser.add_argument("-q", "--questions", default=None,
+                        help="a questions.json (default: the question bank, data/questions.db)")
+    parser.add_argument("-l", "--layout", default="data/layout.json",
+                        help="the generated sheet: printed order and bubble positions (used when the file exists)")
+    grid = parser.add_mutually_exclusive_group()
+    grid.add_argument("--use-layout", action="store_true", help="fail if the layout file is missing")
+    grid.add_argument("--legacy-grid", action="store_true",
+                      help="read the old 5x5 grid with a grade box instead of the layout's bubbles")
+    parser.add_argument("--full-res", action="store_true",
+                        help="find the sheet on a small copy, read the bubbles from the full-resolution image "
+                             "(about 1.6x the time per sheet)")
+    parser.add_argument("--fiducials", action="store_true",
+                        help="locate the sheet by its corner markers (needs the layout)")
+    parser.add_argument("--exam", nargs="?", const=DEFAULT_EXAM, default=None,
+                        help="also record the sheets (with their fill matrices) in the results database")
+    parser.add_argument("--db", default=DB_PATH, help="results database for --exam")
+
+
+def grading_layout_path(args):
+    """
+    The layout file to sample the bubbles of, from add_grading_args options:
+    --layout whenever it exists (or --use-layout insists), None for the legacy
+    grid with --legacy-grid or when there is no layout file.
+    """
+    if args.legacy_grid:
+        return None
+    if args.use_layout or os.path.exists(args.layout):
+        return args.layout
+    print(f"⚠️ No layout at {args.layout}, reading the legacy 5x5 grid")
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade a folder or glob of scanned OMR sheets.")
+    parser.add_argument("source", help="folder, image file or glob pattern")
+    add_grading_args(parser)
+    parser.add_argument("-o", "--output", default="results/batch_results.csv",
+                        help="*.csv, or *.parquet / *.npz for one typed column per question")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="default: all cores; 1 grades in this process and prefetches the next files")
+    parser.add_argument("--prefetch-mb", type=int, default=256,
+                        help="cap on decoded images waiting to be graded (with -j 1)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="detection cache keyed by file content")
+    parser.add_argument("--cache-mb", type=int, default=256, help="evict least recently used entries past this")
+    parser.add_argument("--no-cache", action="store_true", help="process every file again")
+    parser.add_argument("--metrics", default=None,
+                        help='stage timings sink(s), e.g. "log" or "json=results/metrics.json"')
+    parser.add_argument("--items", nargs="?", const="", default=None, metavar="JSON",
+                        help="print the item analysis of the batch (and write it to JSON if given)")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        omr_metrics.configure(args.metrics, interval=None)
+
+    paths = collect_images(args.source)
+    if not paths:
+        parser.error(f"no images found in {args.source}")
+    if args.output.lower().endswith((".parquet", ".npz")):
+        try:
+            check_writer(args.output)
+        except ImportError as e:
+            parser.error(str(e))
+    answer_key = utlis.load_answer_key(args.questions, args.layout)
+    cache = None if args.no_cache else ScanCache(args.cache, args.cache_mb * 2 ** 20)
+    cohort = CohortGrader.for_key(answer_key) if args.items is not None else None
+    try:
+        run_batch(paths, answer_key, args.output, workers=args.workers,
+                  layout_path=grading_layout_path(args), full_res=args.full_res,
+                  fiducials=args.fiducials, prefetch_bytes=args.prefetch_mb * 2 ** 20,
+                  exam=args.exam, db_path=args.db, cache=cache, cohort=cohort)
+    finally:
+        if cache is not None:
+            cache.close()
+    if cohort is not None:
+        item_report(cohort, args.items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# omr/buffers.py
+"""
+Preallocated working images for scan_sheet. Every frame of a live stream or a
+batch worker goes through the same fixed sizes (the 600x400 search level, the
+warp size of the layout), so the resize, gray, blur, Canny, warp, threshold
+and fill buffers are allocated once and OpenCV writes into them via dst=.
+"""
+from collections import deque
+
+import numpy as np
+
+
+class PipelineContext:
+    """
+    Named buffer pool, one per thread (it is not locked). buf() hands out the
+    same array for the same name, shape and dtype, and counts every time it
+    has to allocate; after the first frame of a given size that count should
+    stay at zero, which report() shows.
+
+    Images the next frame still needs (the gray frame the tracker keeps as its
+    previous frame) come from ping-pong buffers: pair() alternates between two
+    arrays per name, switching on every start_frame().
+    """
+
+    def __init__(self, history=300):
+        self._buffers = {}
+        self.allocations = 0
+        self.frames = 0
+        self.per_frame = deque(maxlen=history)  # pool allocations of each recent frame
+        self._frame_start = 0
+
+    def buf(self, name, shape, dtype=np.uint8):
+        shape = tuple(shape)
+        b = self._buffers.get(name)
+        if b is None or b.shape != shape or b.dtype != dtype:
+            b = np.empty(shape, dtype)
+            self._buffers[name] = b
+            self.allocations += 1
+        return b
+
+    def pair(self, name, shape, dtype=np.uint8):
+        return self.buf(f"{name}{self.frames % 2}", shape, dtype)
+
+    def start_frame(self):
+        if self.frames:
+            self.per_frame.append(self.allocations - self._frame_start)
+        self.frames += 1
+        self._frame_start = self.allocations
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self._buffers.values())
+
+    def report(self):
+        steady = list(self.per_frame)[2:]  # the first two frames fill the pool (and both halves of each pair)
+        return (f"buffers: {len(self._buffers)} ({self.nbytes() / 2 ** 20:.1f} MB), "
+                f"{self.allocations} allocations in {self.frames} frames, "
+                f"{(sum(steady) / len(steady)) if steady else 0:.2f} per frame after the first two")
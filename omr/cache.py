@@ -0,0 +1,147 @@
+# omr/cache.py
+"""
+Content-addressed cache of detection results (results/scan_cache.db).
+
+The key is a hash of the image file bytes plus a fingerprint of everything
+that changes what the detector sees: the layout, the legacy grid size, the
+full_res / fiducials options and PIPELINE_VERSION. The answer key is not part
+of it; a hit is graded again against the current key, which costs nothing.
+Images where no sheet was found are cached too (found False, nothing to
+grade): the same bytes under the same settings fail the same way, and a
+failed search, which runs the whole contour pass, is the dearest to repeat.
+Entries are evicted least-recently-used once the cache grows past max_bytes.
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from omr.processor import ScanResult
+
+CACHE_PATH = "results/scan_cache.db"
+PIPELINE_VERSION = 1  # bump when detection changes, so old entries stop matching
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    data        BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+"""
+
+_ARRAYS = ("answers", "fill", "confidence", "homography", "corners", "grade_corners", "q_nos")
+
+
+def config_version(layout=None, questions=None, full_res=False, fiducials=False):
+    """Fingerprint of the detection settings; questions is len(answer_key) for the legacy grid."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr((PIPELINE_VERSION, bool(full_res), bool(fiducials and layout is not None))).encode())
+    if layout is None:
+        h.update(f"legacy:{questions}".encode())
+    else:
+        h.update(repr((layout.q_nos, layout.options, layout.warp_size, layout.abs_threshold)).encode())
+        h.update(layout.index.tobytes())
+    return h.hexdigest()
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def pack_result(result):
+    buf = io.BytesIO()
+    arrays = {name: np.asarray(getattr(result, name)) for name in _ARRAYS if getattr(result, name) is not None}
+    meta = np.float64([result.found, result.abs_threshold, *result.warp_size, *result.frame_size])
+    np.savez(buf, meta=meta, **arrays)
+    return buf.getvalue()
+
+
+def unpack_result(data):
+    """The cached ScanResult, not graded yet (see ScanResult.grade)."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as z:
+        found, abs_threshold, warpW, warpH, frameW, frameH = z["meta"].tolist()
+        result = ScanResult(found=bool(found), abs_threshold=abs_threshold,
+                            warp_size=(int(warpW), int(warpH)), frame_size=(int(frameW), int(frameH)))
+        for name in _ARRAYS:
+            if name in z.files:
+                setattr(result, name, z[name])
+    result.answers = result.answers.tolist()
+    result.q_nos = result.q_nos.tolist()
+    return result
+
+
+class ScanCache:
+    """
+    get()/put() by key, LRU-bounded to max_bytes. The size is tracked in memory
+    after one SUM at open, so one writer per file is assumed (the batch parent).
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=256 * 2 ** 20):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.conn.commit()  # pending last_used touches
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def key(digest, config):
+        return f"{digest}:{config}"
+
+    def get(self, key):
+        """The ScanResult stored under key (ungraded), or None."""
+        row = self.conn.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return unpack_result(row[0])
+
+    def put(self, key, result):
+        data = pack_result(result)
+        with self.conn:
+            old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO entries(key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                              (key, data, len(data), time.time()))
+            self.size += len(data) - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # oldest first until 90% of the budget, so eviction doesn't run on every put
+        target = 0.9 * self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if self.size - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.size -= freed
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM entries")
+        self.size = 0
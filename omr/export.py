@@ -0,0 +1,161 @@
+# omr/export.py
+"""
+Columnar results export: one typed column per question (int8 choice index,
+-2 for "-"), numeric score / total columns and the student names, written in
+one go instead of a dict repr per CSV row.
+
+    python -m omr.export results/results.parquet           # from results.db (needs pyarrow)
+    python -m omr.export results/results.npz --exam midterm
+    python -m omr.export results/columns/                  # .npy per column, memory-mappable
+    python -m omr.export results/columns/ --from-csv results/results.csv
+
+load() opens any of the three; a .npy directory is memory-mapped, so a
+column of a large cohort costs nothing until it is read.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from omr.store import DB_PATH, LETTER_INDEX, open_store, read_results_csv
+
+FORMATS = ("parquet", "npz", "npy")
+
+
+def columns_from_rows(rows, q_nos=None):
+    """
+    Columns from (student, answers, score, total) rows, answers being
+    {q_no: letter}. q_nos defaults to every question seen, in order.
+    """
+    rows = list(rows)
+    if q_nos is None:
+        q_nos = sorted({int(q) for _, answers, _, _ in rows for q in answers})
+    col = {q: i for i, q in enumerate(q_nos)}
+    answers = np.full((len(rows), len(q_nos)), -2, np.int8)
+    for r, (_, row_answers, _, _) in enumerate(rows):
+        for q, letter in row_answers.items():
+            if int(q) in col:
+                answers[r, col[int(q)]] = LETTER_INDEX.get(letter, -2)
+    return {"student": np.array([r[0] for r in rows], dtype=str),
+            "score": np.array([r[2] for r in rows], np.float32),
+            "total": np.array([r[3] for r in rows], np.int16),
+            "q_nos": np.array(q_nos, np.int32),
+            "answers": answers}
+
+
+def columns_from_store(store, exam=None):
+    rows = store.query(exam=exam)  # ordered by id, like answer_matrix
+    ids, q_nos, answers = store.answer_matrix(exam)
+    return {"id": ids,
+            "student": np.array([r[1] for r in rows], dtype=str),
+            "score": np.array([r[3] for r in rows], np.float32),
+            "total": np.array([r[4] for r in rows], np.int16),
+            "q_nos": np.array(q_nos, np.int32),
+            "answers": answers}
+
+
+def columns_from_csv(csv_path):
+    """Parse an old results.csv once, the same way ResultStore.import_csv does."""
+    return columns_from_rows(read_results_csv(csv_path))
+
+
+def _format(path, fmt=None):
+    # load() only has the name to go by, so an explicit format has to agree with it
+    ext = os.path.splitext(path.rstrip("/\\"))[1].lower()
+    named = {".parquet": "parquet", ".npz": "npz"}.get(ext, "npy")
+    if fmt is not None and fmt != named:
+        raise ValueError(f"format {fmt} does not match {path}, which load() reads as {named}")
+    return named
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow); use .npz or a folder instead")
+    return pa, pq
+
+
+def check_writer(path, fmt=None):
+    """Raise what write_columns(path, ..., fmt) would, before the columns are computed (e.g. a whole batch)."""
+    if _format(path, fmt) == "parquet":
+        _pyarrow()
+
+
+def write_columns(path, cols, fmt=None):
+    """
+    Write columns as Parquet (zstd), a compressed .npz or a directory of .npy
+    files, chosen by the name of path; fmt, if given, must agree with it.
+    """
+    fmt = _format(path, fmt)
+    os.makedirs(os.path.dirname(path.rstrip("/\\")) or ".", exist_ok=True)
+    if fmt == "parquet":
+        pa, pq = _pyarrow()
+        table = {name: cols[name] for name in ("id", "student", "score", "total") if name in cols}
+        for i, q in enumerate(cols["q_nos"]):
+            table[f"q{q}"] = cols["answers"][:, i]
+        pq.write_table(pa.table(table), path, compression="zstd")
+    elif fmt == "npz":
+        np.savez_compressed(path, **cols)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, values in cols.items():
+            # answers column-major: every question is one contiguous column on disk
+            np.save(os.path.join(path, name + ".npy"), np.asfortranarray(values) if values.ndim == 2 else values)
+        with open(os.path.join(path, "columns.json"), "w", encoding="utf-8") as f:
+            json.dump(sorted(cols), f)
+
+
+def load(path, mmap=True):
+    """
+    Columns written by write_columns as numpy arrays. A .npy directory is
+    memory-mapped (read-only) unless mmap is False; Parquet is read through a
+    memory map and per-question columns are stacked back into "answers".
+    """
+    fmt = _format(path)
+    if fmt == "npz":
+        with np.load(path, allow_pickle=False) as z:
+            return {name: z[name] for name in z.files}
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=mmap)
+        q_cols = [c for c in table.column_names if c.startswith("q") and c[1:].isdigit()]
+        cols = {c: table.column(c).to_numpy() for c in table.column_names if c not in q_cols}
+        cols["q_nos"] = np.array([int(c[1:]) for c in q_cols], np.int32)
+        cols["answers"] = np.stack([table.column(c).to_numpy() for c in q_cols], axis=1) if q_cols \
+            else np.zeros((table.num_rows, 0), np.int8)
+        return cols
+    with open(os.path.join(path, "columns.json"), "r", encoding="utf-8") as f:
+        names = json.load(f)
+    return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+            for name in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export results as typed columns (Parquet, .npz or .npy folder).")
+    parser.add_argument("output", help="*.parquet, *.npz, or a folder for memory-mappable .npy columns")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="check the output name gives this format (load() reads by name)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--exam", default=None, help="only this exam (default: all)")
+    parser.add_argument("--from-csv", help="convert an old results.csv instead of reading the database")
+    args = parser.parse_args(argv)
+
+    try:
+        check_writer(args.output, args.format)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    if args.from_csv:
+        cols = columns_from_csv(args.from_csv)
+    else:
+        with open_store(args.db) as store:
+            cols = columns_from_store(store, args.exam)
+    write_columns(args.output, cols, args.format)
+    print(f"✅ Exported {len(cols['student'])} results x {len(cols['q_nos'])} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
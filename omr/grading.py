@@ -0,0 +1,185 @@
+# omr/grading.py
+"""
+Cohort grading and item analysis over an (N students, Q questions) answer
+matrix of choice indices, -1 for multiple marks and -2 for blank (the values
+pickAnswers returns). grade_matrix is the one scoring rule: ScanResult.grade,
+omr.regrade and CohortGrader all go through it.
+
+    python -m omr.grading                     # item analysis of every stored result
+    python -m omr.grading --exam midterm --json results/items.json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from omr import utlis
+from omr.store import DB_PATH, open_store
+
+BLANK, MULTI = -2, -1
+
+
+def grade_matrix(answers, key):
+    """
+    correct (N, Q) bool and scores (N,) correct counts in one pass. key holds
+    the correct choice per question; a negative key (no answer set) is never correct.
+    """
+    answers = np.asarray(answers)
+    key = np.asarray(key)
+    correct = (answers == key) & (key >= 0)
+    return correct, correct.sum(axis=-1)
+
+
+class CohortGrader:
+    """
+    Grades sheets as they arrive and keeps running item statistics:
+
+    - difficulty: proportion of students answering each question correctly
+    - discrimination: point-biserial correlation of each question with the total score
+    - choice / blank / multi frequencies per question (the distractor analysis)
+
+    Only sums are updated per sheet, so stats() is O(Q) however large the cohort.
+    The answers are kept (int8) so a changed key can be applied with set_key().
+    q_nos names the question of each key column; add_result() uses it to put a
+    ScanResult's printed rows in key order.
+    """
+
+    def __init__(self, key, choices=len(utlis.LETTER_TO_INDEX), capacity=1024, q_nos=None):
+        self.key = np.asarray(key, np.int8)
+        self.questions = len(self.key)
+        self.q_nos = list(q_nos) if q_nos is not None else list(range(1, self.questions + 1))
+        self.choices = choices
+        self._answers = np.empty((capacity, self.questions), np.int8)
+        self.n = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        Q = self.questions
+        self.n_correct = np.zeros(Q, np.int64)
+        self.sum_total = 0
+        self.sum_total_sq = 0
+        self.sum_total_correct = np.zeros(Q, np.int64)  # total score of the students who got it right
+        self.counts = np.zeros((Q, self.choices + 2), np.int64)  # columns: blank, multi, A, B, ...
+
+    @classmethod
+    def for_key(cls, answer_key, **kwargs):
+        """A grader over the questions of a {q_no: choice} answer key, in its order."""
+        return cls(list(answer_key.values()), q_nos=list(answer_key), **kwargs)
+
+    @property
+    def answers(self):
+        return self._answers[:self.n]
+
+    def add(self, answers):
+        """Grade new sheets, one row (or an (n, Q) block) of answers. Returns (correct, scores)."""
+        answers = np.atleast_2d(np.asarray(answers, np.int8))
+        if answers.shape[1] != self.questions:
+            raise ValueError(f"Expected {self.questions} answers per sheet, got {answers.shape[1]}")
+        if answers.min(initial=0) < BLANK or answers.max(initial=0) >= self.choices:
+            raise ValueError(f"Answers must be in {BLANK}..{self.choices - 1}")
+        if self.n + len(answers) > len(self._answers):
+            grown = np.empty((max(2 * len(self._answers), self.n + len(answers)), self.questions), np.int8)
+            grown[:self.n] = self.answers
+            self._answers = grown
+        self._answers[self.n:self.n + len(answers)] = answers
+        self.n += len(answers)
+        return self._accumulate(answers)
+
+    def add_result(self, result):
+        """Add one found ScanResult; questions that are not on the sheet count as blank."""
+        picked = dict(zip(result.q_nos, result.answers))
+        return self.add([picked.get(q_no, BLANK) for q_no in self.q_nos])
+
+    def _accumulate(self, answers):
+        correct, scores = grade_matrix(answers, self.key)
+        self.n_correct += correct.sum(axis=0)
+        self.sum_total += int(scores.sum())
+        self.sum_total_sq += int((scores.astype(np.int64) ** 2).sum())
+        self.sum_total_correct += scores @ correct
+        width = self.choices + 2
+        cells = np.arange(self.questions) * width + (answers.astype(np.int64) + 2)
+        self.counts += np.bincount(cells.ravel(), minlength=self.questions * width).reshape(self.questions, width)
+        return correct, scores
+
+    def set_key(self, key):
+        """Apply a corrected key: all kept answers are graded again in one pass."""
+        self.key = np.asarray(key, np.int8)
+        self._reset_sums()
+        if self.n:
+            self._accumulate(self.answers)
+
+    def scores(self):
+        return grade_matrix(self.answers, self.key)[1]
+
+    def stats(self):
+        n = self.n
+        if n == 0:
+            return {"students": 0}
+        p = self.n_correct / n
+        mean = self.sum_total / n
+        sd = np.sqrt(max(self.sum_total_sq / n - mean ** 2, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m1 = self.sum_total_correct / self.n_correct
+            m0 = (self.sum_total - self.sum_total_correct) / (n - self.n_correct)
+            r_pb = (m1 - m0) / sd * np.sqrt(p * (1 - p))
+        r_pb = np.where(np.isfinite(r_pb), r_pb, 0.0)  # everyone (or no one) right, or no spread
+        freq = self.counts / n
+        return {"students": n,
+                "mean_score": mean,
+                "sd_score": float(sd),
+                "difficulty": p,
+                "discrimination": r_pb,
+                "choice_freq": freq[:, 2:],
+                "blank_rate": freq[:, 0],
+                "multi_rate": freq[:, 1]}
+
+
+def print_report(stats, q_nos, key):
+    print(f"{stats['students']} students, mean score {stats['mean_score']:.2f} (sd {stats['sd_score']:.2f})")
+    letters = [utlis.INDEX_TO_LETTER[c] for c in range(stats["choice_freq"].shape[1])]
+    print(f"{'Q':>4} {'key':>4} {'diff':>6} {'disc':>6} " + " ".join(f"{l:>5}" for l in letters) + f" {'blank':>6}")
+    for i, q_no in enumerate(q_nos):
+        freq = " ".join(f"{f:>5.0%}" for f in stats["choice_freq"][i])
+        print(f"{q_no:>4} {utlis.INDEX_TO_LETTER.get(int(key[i]), '-'):>4} {stats['difficulty'][i]:>6.2f} "
+              f"{stats['discrimination'][i]:>6.2f} {freq} {stats['blank_rate'][i]:>6.0%}")
+
+
+def stats_json(stats, q_nos):
+    """stats() with plain lists, for json.dump."""
+    return ({k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in stats.items()}
+            | {"q_nos": [int(q) for q in q_nos]})
+
+
+def item_report(grader, json_path=None):
+    """Print the item analysis of a CohortGrader and, with json_path, write it as JSON."""
+    stats = grader.stats()
+    if stats["students"] == 0:
+        print("No graded sheets to analyse.")
+        return
+    print_report(stats, grader.q_nos, grader.key)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(stats_json(stats, grader.q_nos), f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Item analysis of the stored results.")
+    parser.add_argument("-q", "--questions", default=None,
+                        help="a questions.json (default: the question bank, data/questions.db)")
+    parser.add_argument("-l", "--layout", default="data/layout.json")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--exam", default=None, help="only this exam (default: all)")
+    parser.add_argument("--json", help="write the statistics to this file")
+    args = parser.parse_args(argv)
+
+    answer_key = utlis.load_answer_key(args.questions, args.layout)
+    with open_store(args.db) as store:
+        _, q_nos, answers = store.answer_matrix(args.exam, list(answer_key))
+    key = np.array([answer_key[q] for q in q_nos])
+    grader = CohortGrader(key, q_nos=q_nos)
+    grader.add(answers)
+    item_report(grader, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# omr/layout.py
+"""
+Bubble positions from data/layout.json (written by teacher/generate_sheet.py),
+compiled once into sampling tables for the warped sheet.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+PAGE_SIZE = (800, 1100)  # (width, height) of the page drawn by generate_omr_sheet
+WARP_SIZE = (400, 550)  # the page is warped to this size before sampling
+FIDUCIAL_SIZE = 26  # solid corner squares printed by generate_omr_sheet
+FIDUCIAL_MARGIN = 20
+
+
+def fiducial_centers(page_size=PAGE_SIZE):
+    """Centers of the four corner squares in page pixels, ordered tl, tr, bl, br like utlis.reorder."""
+    width, height = page_size
+    c = FIDUCIAL_MARGIN + FIDUCIAL_SIZE / 2
+    return np.float32([[c, c], [width - c, c], [c, height - c], [width - c, height - c]])
+
+
+class BubbleLayout:
+    """
+    Layout rectangles scaled to a warped sheet of warp_size, with a circular
+    mask of flat pixel indices per bubble so only bubble pixels get sampled.
+
+    questions x choices follow the printed order; q_nos[i] is the original
+    question number of printed row i (the key of the answer_key dict).
+    """
+
+    def __init__(self, layout, warp_size=WARP_SIZE, page_size=PAGE_SIZE, mask_ratio=0.7):
+        rows = sorted(layout, key=lambda e: e["printed_index"])
+        if not rows:
+            raise ValueError("Layout has no questions")
+        self.options = list(rows[0]["options"].keys())
+        if any(list(e["options"].keys()) != self.options for e in rows):
+            raise ValueError("All layout rows must have the same options")
+
+        self.warp_size = tuple(warp_size)
+        self.q_nos = [e["original_q_no"] for e in rows]
+        self.questions = len(rows)
+        self.choices = len(self.options)
+
+        width, height = self.warp_size
+        scale = np.float32([width / page_size[0], height / page_size[1]])
+        rects = np.float32([[e["options"][o] for o in self.options] for e in rows])  # (Q, C, [x, y, w, h])
+        self.centers = (rects[..., :2] + rects[..., 2:] / 2) * scale  # (Q, C, [x, y]) in warp pixels
+        self.radius = float(rects[..., 2:].min() / 2 * scale.min())
+        self.fiducials = fiducial_centers(page_size) * scale  # corner markers in warp pixels
+
+        # circle inside the printed outline, so an empty bubble samples (almost) nothing
+        r = max(1, int(self.radius * mask_ratio))
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        inside = dx ** 2 + dy ** 2 <= r * r
+        dx, dy = dx[inside], dy[inside]
+        cx = np.rint(self.centers[..., 0]).astype(np.intp)[..., None]
+        cy = np.rint(self.centers[..., 1]).astype(np.intp)[..., None]
+        xs = np.clip(cx + dx, 0, width - 1)
+        ys = np.clip(cy + dy, 0, height - 1)
+        self.index = ys * width + xs  # (Q, C, K) flat pixel indices
+        self.mask_area = len(dx)
+        self.abs_threshold = 0.5 * self.mask_area
+
+    def fill(self, imgThresh, out=None):
+        """
+        Filled pixels under every bubble mask of a thresholded warp (H, W)
+        or a stack of them (N, H, W). Returns (Q, C) or (N, Q, C).
+        out is an optional (Q, C, K) buffer for the gathered pixels of a single warp.
+        """
+        flat = imgThresh.reshape(imgThresh.shape[:-2] + (-1,))
+        if out is not None and flat.ndim == 1:
+            return np.count_nonzero(np.take(flat, self.index, out=out, mode="clip"), axis=-1)  # index is in range
+        return np.count_nonzero(flat[..., self.index], axis=-1)
+
+
+@lru_cache(maxsize=8)
+def _compile(path, mtime, warp_size):
+    with open(path, "r", encoding="utf-8") as f:
+        return BubbleLayout(json.load(f), warp_size)
+
+
+def load_layout(path="data/layout.json", warp_size=WARP_SIZE):
+    """Compiled layout, cached until the file changes."""
+    return _compile(path, os.path.getmtime(path), tuple(warp_size))
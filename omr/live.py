@@ -0,0 +1,243 @@
+# omr/live.py
+"""
+Pipelined live scanner: capture thread -> processing worker -> display on the main thread.
+
+The queues between the stages are bounded and drop the oldest frame when full,
+so the worker always grades the newest frame and the preview never falls behind
+the camera.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from omr import utlis
+from omr.buffers import PipelineContext
+from omr.processor import scan_frame
+from omr.tracking import SheetTracker
+from omr.voting import FrameVoter
+
+
+class LatestQueue:
+    """Bounded queue where put() drops the oldest item and get() returns the newest."""
+
+    def __init__(self, maxsize=1):
+        self.q = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self.q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        item = self.q.get(timeout=timeout)
+        while True:  # skip anything stale
+            try:
+                item = self.q.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                return item
+
+
+class StageStats:
+    """Frames per second, busy time and camera-to-stage latency of one pipeline stage."""
+
+    def __init__(self, name, window=300):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+        self.latency = deque(maxlen=window)
+
+    def add(self, busy, captured_at=None):
+        self.count += 1
+        self.busy += busy
+        if captured_at is not None:
+            self.latency.append(time.perf_counter() - captured_at)
+
+    def fps(self):
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        s = f"{self.name}: {self.fps():.1f} FPS"
+        if self.count:
+            s += f", {1000 * self.busy / self.count:.1f} ms/frame"
+        if self.latency:
+            lat = np.array(self.latency) * 1000
+            s += f", latency p50 {np.percentile(lat, 50):.0f} ms / max {lat.max():.0f} ms"
+        return s
+
+
+class LiveScanner:
+    """
+    Runs capture and detection on background threads. The caller (the display
+    loop on the main thread) polls latest() for the newest graded frame. With a
+    voter (omr.voting.FrameVoter) every processed frame is also voted on, on the
+    processing thread, so no frame is left out of the vote when display drops one.
+    """
+
+    def __init__(self, answer_key, layout=None, camera=1, queue_size=2, track=True, voter=None):
+        self.answer_key = answer_key
+        self.voter = voter
+        self._vote_lock = threading.Lock()
+        self._reset_at = 0.0  # frames captured before this belong to the previous sheet
+        self.layout = layout
+        self.camera = camera
+        self.frames = LatestQueue(queue_size)
+        self.results = LatestQueue(1)
+        self.tracker = SheetTracker() if track else None
+        self.ctx = PipelineContext()  # working images of the processing thread
+        self.stats = {name: StageStats(name) for name in ("capture", "process", "display")}
+        self._stop = threading.Event()
+        self._threads = []
+        self.cap = None
+
+    def start(self):
+        self.cap = cv2.VideoCapture(self.camera)
+        if not self.cap.isOpened():
+            return False
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True),
+                         threading.Thread(target=self._process_loop, daemon=True)]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2)
+        if self.cap is not None:
+            self.cap.release()
+
+    def running(self):
+        return not self._stop.is_set()
+
+    def latest(self, timeout=0.05):
+        """(captured_at, frame, ScanResult, Vote or None) of the newest graded frame, or None."""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def report(self):
+        lines = [self.stats[name].summary() for name in ("capture", "process", "display")]
+        lines.append(f"dropped: {self.frames.dropped} frames before processing, "
+                     f"{self.results.dropped} results before display")
+        lines.append(self.ctx.report())
+        return "\n".join(lines)
+
+    def _capture_loop(self):
+        stats = self.stats["capture"]
+        while not self._stop.is_set():
+            t = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                self._stop.set()
+                break
+            stats.add(time.perf_counter() - t)
+            self.frames.put((time.perf_counter(), frame))
+
+    def _process_loop(self):
+        stats = self.stats["process"]
+        while not self._stop.is_set():
+            try:
+                captured_at, frame = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            t = time.perf_counter()
+            frame, result = scan_frame(frame, self.answer_key, self.layout, self.tracker, ctx=self.ctx)
+            with self._vote_lock:  # a reset() can't fall between the vote and the put
+                vote = None
+                if self.voter is not None and captured_at >= self._reset_at:
+                    vote = self.voter.add(result, self.answer_key)
+                stats.add(time.perf_counter() - t, captured_at)
+                self.results.put((captured_at, frame, result, vote))
+
+    def reset(self, answer_key=None):
+        """
+        Start over for the next sheet (optionally with another key). Safe while
+        running. Frames captured before the reset are not voted on, and the
+        voter holds until the previous sheet has left (FrameVoter.hold).
+        """
+        if answer_key is not None:
+            self.answer_key = answer_key
+        if self.tracker is not None:
+            self.tracker.reset()
+        with self._vote_lock:
+            self._reset_at = time.perf_counter()
+            if self.voter is not None:
+                self.voter.hold()
+            self.results.put(None)  # anything still queued belongs to the previous sheet
+
+
+def threaded_scan(student_id, answer_key, layout=None, camera=1, auto=True, voter=None):
+    """
+    Same contract as processor.realtime_scan (press 'c' to capture, 'q' to quit),
+    with capture and detection running on background threads. The answers of the
+    last frames are voted on (omr.voting); with auto the sheet is captured by
+    itself once every row has been stable for voter.stable_frames frames.
+    """
+    voter = voter or FrameVoter()
+    scanner = LiveScanner(answer_key, layout, camera, voter=voter)
+    if not scanner.start():
+        print("❌ Cannot access camera!")
+        return {}, 0, None
+
+    print(f"📷 Camera started for Student ID: {student_id}")
+    student_answers = {}
+    captured = False
+    last = None
+    display = scanner.stats["display"]
+    q_nos = layout.q_nos if layout is not None else None
+
+    while scanner.running():
+        result = scanner.latest()
+        if result is not None:
+            t = time.perf_counter()
+            last = result
+            captured_at, frame, _, vote = result
+            cv2.putText(frame, f"{scanner.stats['process'].fps():.0f} FPS", (frame.shape[1] - 110, 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+            if vote is not None:
+                cv2.putText(frame, f"stable {vote.stable_rows(voter.stable_frames)}/{len(vote.stable)}",
+                            (frame.shape[1] - 160, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+            cv2.imshow("OMR Realtime Scan - Press 'c' to capture, 'q' to quit", frame)
+            display.add(time.perf_counter() - t, captured_at)
+
+        key = cv2.waitKey(1) & 0xFF
+        vote = last[3] if last is not None else None
+        if (key == ord('c') and last is not None) or (auto and vote is not None and vote.ready):
+            scan = vote.result if vote is not None else last[2]  # voted answers and median fill
+            student_answers.update(utlis.answers_to_letters(scan.answers, q_nos))
+            captured = True
+            print("✅ Answers captured!" + (f" ({vote.frames} frames agree)" if vote is not None and vote.ready else ""))
+            break
+        elif key == ord('q'):
+            if not captured:
+                print("⚠️ Exiting without capturing answers.")
+            break
+
+    scanner.stop()
+    cv2.destroyAllWindows()
+    print(scanner.report())
+
+    if captured:
+        score = (scan.score / 100) * len(answer_key)
+        print(f"✅ Scan complete for Student {student_id}: Score {score}/{len(answer_key)}")
+    else:
+        score = -1
+        scan = None
+
+    return student_answers, score, scan
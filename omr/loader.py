@@ -0,0 +1,110 @@
+# omr/loader.py
+"""
+Image decoding for file-based scanning. Without full_res the pipeline only
+ever looks at a 600x400 grayscale copy, so files are decoded in grayscale and,
+where the format supports it (JPEG), at 1/2, 1/4 or 1/8 scale straight from
+the compressed data. PrefetchLoader decodes the next files on background
+threads while the current sheet is graded.
+"""
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+SEARCH_SIZE = (600, 400)  # omr.processor WIDTH_IMG x HEIGHT_IMG
+
+_GRAY = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+         4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+          4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+def decode_factor(path, min_size=SEARCH_SIZE):
+    """Largest of 1/2/4/8 that keeps the decoded image at least min_size (header only); path may be a file object."""
+    try:
+        with Image.open(path) as im:
+            w, h = im.size
+    except OSError:
+        return 1
+    factor = 1
+    while factor < 8 and w // (2 * factor) >= min_size[0] and h // (2 * factor) >= min_size[1]:
+        factor *= 2
+    return factor
+
+
+def read_image(path, full_res=False, gray=True):
+    """
+    cv2.imread for scan_sheet: None if the file can't be decoded. With
+    full_res the image keeps its resolution, otherwise it is decoded just big
+    enough for the 600x400 search level.
+    """
+    factor = 1 if full_res else decode_factor(path)
+    return cv2.imread(path, (_GRAY if gray else _COLOR)[factor])
+
+
+def decode_image(data, full_res=False, gray=True):
+    """read_image for an encoded image already in memory (an upload); None if it can't be decoded."""
+    if not data:
+        return None
+    factor = 1 if full_res else decode_factor(io.BytesIO(data))
+    return cv2.imdecode(np.frombuffer(data, np.uint8), (_GRAY if gray else _COLOR)[factor])
+
+
+class PrefetchLoader:
+    """
+    Iterates (path, image) in the order of paths while up to `ahead` files are
+    decoded on `workers` threads. Decoded images waiting to be consumed are
+    capped at max_bytes (in-flight ones are counted at the average size so far).
+    """
+
+    def __init__(self, paths, workers=2, ahead=4, max_bytes=256 * 2 ** 20, full_res=False, gray=True):
+        self.paths = list(paths)
+        self.workers = workers
+        self.ahead = ahead
+        self.max_bytes = max_bytes
+        self.full_res = full_res
+        self.gray = gray
+        self.avg_bytes = 0.0
+        self.decoded = 0
+
+    def read(self, path):
+        img = read_image(path, self.full_res, self.gray)
+        if img is not None:
+            self.decoded += 1
+            self.avg_bytes += (img.nbytes - self.avg_bytes) / self.decoded
+        return img
+
+    def held_bytes(self, pending):
+        held = 0.0
+        for _, future in pending:
+            if future.done() and future.exception() is None:
+                img = future.result()
+                held += img.nbytes if img is not None else 0
+            else:
+                held += self.avg_bytes
+        return held
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        pending = deque()
+        remaining = iter(self.paths)
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix="omr-decode")
+        try:
+            while True:
+                # always keep one in flight, then fill up to `ahead` within the memory cap
+                while len(pending) < self.ahead and (not pending or self.held_bytes(pending) < self.max_bytes):
+                    path = next(remaining, None)
+                    if path is None:
+                        break
+                    pending.append((path, pool.submit(self.read, path)))
+                if not pending:
+                    return
+                path, future = pending.popleft()
+                yield path, future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
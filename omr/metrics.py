@@ -0,0 +1,225 @@
+# omr/metrics.py
+"""
+Per-stage timings and outcome counters for the grading pipeline.
+
+Off by default: scan_sheet only pays for a `None` check. Turn it on with
+
+    OMR_METRICS=log                       # one summary line per flush
+    OMR_METRICS=json=results/metrics.json # snapshot file, rewritten on flush
+    OMR_METRICS=http=9464                 # GET http://127.0.0.1:9464/metrics
+    OMR_METRICS=log,http=9464             # several sinks at once
+
+or in code with configure("log") / Metrics(sinks=[...]).
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+active = None  # the process-wide Metrics used by scan_sheet when none is passed
+
+
+class Metrics:
+    """Thread-safe stage durations (last `window` samples each) and counters."""
+
+    def __init__(self, sinks=(), window=1000, interval=None):
+        self.sinks = list(sinks)
+        self.window = window
+        self.interval = interval  # seconds between automatic flushes, None = only flush()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(lambda: deque(maxlen=self.window))
+            self.totals = defaultdict(float)
+            self.calls = defaultdict(int)
+            self.counters = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.samples[name].append(seconds)
+            self.totals[name] += seconds
+            self.calls[name] += 1
+        self._maybe_flush()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        """{"stages": {name: {calls, total_ms, p50_ms, p99_ms, max_ms}}, "counters": {...}}"""
+        with self._lock:
+            stages = {}
+            for name, samples in self.samples.items():
+                ms = np.array(samples) * 1000
+                stages[name] = {"calls": self.calls[name],
+                                "total_ms": round(self.totals[name] * 1000, 3),
+                                "p50_ms": round(float(np.percentile(ms, 50)), 3) if len(ms) else 0.0,
+                                "p99_ms": round(float(np.percentile(ms, 99)), 3) if len(ms) else 0.0,
+                                "max_ms": round(float(ms.max()), 3) if len(ms) else 0.0}
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def drain(self):
+        """Raw samples and counters since the last drain, for merging across processes."""
+        with self._lock:
+            out = {"stages": {name: list(s) for name, s in self.samples.items()},
+                   "counters": dict(self.counters)}
+        self.reset()
+        return out
+
+    def merge(self, drained):
+        with self._lock:
+            for name, seconds in drained["stages"].items():
+                self.samples[name].extend(seconds)
+                self.totals[name] += sum(seconds)
+                self.calls[name] += len(seconds)
+            for name, n in drained["counters"].items():
+                self.counters[name] += n
+        self._maybe_flush()
+
+    def flush(self):
+        snap = self.snapshot()
+        for sink in self.sinks:
+            sink.write(snap)
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            getattr(sink, "close", lambda: None)()
+
+    def _maybe_flush(self):
+        if self.interval is not None and time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+
+# ---- sinks ----
+class LogSink:
+    """One compact line per flush (print by default, or any callable such as logger.info)."""
+
+    def __init__(self, emit=print):
+        self.emit = emit
+
+    def write(self, snap):
+        stages = " ".join(f"{name}={s['p50_ms']:.2f}/{s['p99_ms']:.2f}ms"
+                          for name, s in snap["stages"].items())
+        counters = " ".join(f"{name}={n}" for name, n in snap["counters"].items())
+        self.emit(f"[omr metrics] p50/p99 {stages} | {counters}")
+
+
+class JsonFileSink:
+    """Rewrites a JSON snapshot file on every flush (atomically)."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, snap):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class HttpSink:
+    """
+    Local scrape endpoint. GET /metrics returns Prometheus text, GET /metrics.json
+    the snapshot. It reads the live Metrics, so flushes are not needed.
+    """
+
+    def __init__(self, port=9464, host="127.0.0.1"):
+        self.metrics = None
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if sink.metrics is None or self.path not in ("/metrics", "/metrics.json"):
+                    self.send_error(404)
+                    return
+                snap = sink.metrics.snapshot()
+                if self.path == "/metrics.json":
+                    body, ctype = json.dumps(snap).encode(), "application/json"
+                else:
+                    body, ctype = prometheus_text(snap).encode(), "text/plain; version=0.0.4"
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def attach(self, metrics):
+        self.metrics = metrics
+
+    def write(self, snap):
+        pass
+
+    def close(self):
+        self.server.shutdown()
+
+
+def prometheus_text(snap):
+    lines = ["# TYPE omr_stage_seconds summary"]
+    for name, s in snap["stages"].items():
+        lines.append(f'omr_stage_seconds{{stage="{name}",quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+        lines.append(f'omr_stage_seconds{{stage="{name}",quantile="0.99"}} {s["p99_ms"] / 1000:.6f}')
+        lines.append(f'omr_stage_seconds_sum{{stage="{name}"}} {s["total_ms"] / 1000:.6f}')
+        lines.append(f'omr_stage_seconds_count{{stage="{name}"}} {s["calls"]}')
+    lines.append("# TYPE omr_events_total counter")
+    for name, n in snap["counters"].items():
+        lines.append(f'omr_events_total{{event="{name}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+def configure(spec, interval=30.0):
+    """
+    Build the process-wide Metrics from a spec like "log,json=path,http=port"
+    and make it active. An empty spec turns metrics off. Returns the Metrics (or None).
+    """
+    global active
+    if active is not None:
+        active.close()
+        active = None
+    if not spec:
+        return None
+    sinks = []
+    for part in spec.split(","):
+        kind, _, arg = part.strip().partition("=")
+        if kind == "log":
+            sinks.append(LogSink())
+        elif kind == "json":
+            sinks.append(JsonFileSink(arg or "results/metrics.json"))
+        elif kind == "http":
+            sinks.append(HttpSink(int(arg or 9464)))
+        else:
+            raise ValueError(f"Unknown metrics sink: {kind}")
+    active = Metrics(sinks, interval=interval)
+    for sink in sinks:
+        if isinstance(sink, HttpSink):
+            sink.attach(active)
+    return active
+
+
+if os.environ.get("OMR_METRICS") and multiprocessing.parent_process() is None:
+    configure(os.environ["OMR_METRICS"])  # worker processes get theirs from the parent
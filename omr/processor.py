@@ -1,162 +1,363 @@
-from tkinter import messagebox
+import traceback
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 
 import cv2
 import numpy as np
 
+from omr import metrics as omr_metrics
 from omr import utlis
+from omr.fiducials import find_fiducials, refine_fiducials
+from omr.grading import grade_matrix
+from omr.loader import read_image
+from omr.tracking import SheetTracker
 
+WIDTH_IMG = 600
+HEIGHT_IMG = 400  # every frame is resized to this before the sheet search
 
-def detect_bubbles(img, answer_key):
-    widthImg = 600
-    heightImg = 400
-    questions = len(answer_key)
-    choices = len(answer_key)
-    myIndex = []
-    score =0
-    ans = []
 
-    try:
-        img = cv2.resize(img, (widthImg, heightImg))  # RESIZE IMAGE
-        imgFinal = img.copy()
-        imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        imgBlur = cv2.GaussianBlur(imgGray, (5, 5), 1)
-        imgCanny = cv2.Canny(imgBlur, 10, 70)
-
-        # find all contours
-        imgContours = img.copy()  # COPY IMAGE FOR DISPLAY PURPOSES
-        imgBigContour = img.copy()  # COPY IMAGE FOR DISPLAY PURPOSES
+def _no_stage(name):
+    return nullcontext()
+
+
+def _perspective(key, src, dst):
+    # same signature as SheetTracker.homography, without the cache
+    return cv2.getPerspectiveTransform(src, dst)
+
+
+def find_sheet(imgGray, stage=_no_stage, ctx=None):
+    """
+    Full search for the sheet: the biggest rectangle contour is the OMR area and
+    the second biggest the grade box. Returns reordered (biggestPoints, gradePoints),
+    gradePoints being None without a second rectangle, or None if nothing is found.
+    """
+    with stage("blur"):
+        imgBlur = cv2.GaussianBlur(imgGray, (5, 5), 1,
+                                   dst=ctx.buf("blur", imgGray.shape) if ctx is not None else None)
+    with stage("canny"):
+        imgCanny = cv2.Canny(imgBlur, 10, 70, edges=ctx.buf("canny", imgGray.shape) if ctx is not None else None)
+    with stage("findContours"):
         contours, _ = cv2.findContours(imgCanny, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    with stage("rectContour"):
         rectCon = utlis.rectContour(contours)  # FILTER FOR RECTANGLE CONTOURS
-        if len(rectCon) < 1:
-            print("⚠️ No OMR Sheet detected!")
-            cv2.putText(img, "! No OMR Sheet detected!", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            return img,score,myIndex
-
-        biggestPoints = utlis.getCornerPoints(rectCon[0])
-        gradePoints = utlis.getCornerPoints(rectCon[1]) if len(rectCon) > 1 else None
-
-        if biggestPoints.size != 0 and gradePoints is not None and gradePoints.size != 0:
-            # WARP MAIN OMR
-            biggestPoints = utlis.reorder(biggestPoints)
-            pts1 = np.float32(biggestPoints)
-            pts2 = np.float32([[0, 0], [widthImg, 0], [0, heightImg], [widthImg, heightImg]])
-            matrix = cv2.getPerspectiveTransform(pts1, pts2)
-            imgWarpColored = cv2.warpPerspective(img, matrix, (widthImg, heightImg))
-
-            # SECOND BIGGEST RECTANGLE WARPING
-            cv2.drawContours(imgBigContour, gradePoints, -1, (255, 0, 0), 20)  # DRAW THE BIGGEST CONTOUR
-            gradePoints = utlis.reorder(gradePoints)  # REORDER FOR WARPING
-            ptsG1 = np.float32(gradePoints)  # PREPARE POINTS FOR WARP
-            ptsG2 = np.float32([[0, 0], [325, 0], [0, 150], [325, 150]])  # PREPARE POINTS FOR WARP
-            matrixG = cv2.getPerspectiveTransform(ptsG1, ptsG2)  # GET TRANSFORMATION MATRIX
-            imgGradeDisplay = cv2.warpPerspective(img, matrixG, (325, 150))  # APPLY WARP PERSPECTIVE
-
-            # APPLY THRESHOLD
-            imgWarpGray = cv2.cvtColor(imgWarpColored, cv2.COLOR_BGR2GRAY)
-            imgThresh = cv2.threshold(imgWarpGray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-            # cv2.imshow("Thredshow",imgThresh)
-            boxes = utlis.splitBoxes(imgThresh)  # GET INDIVIDUAL BOXES
-            myPixelVal = np.zeros((questions, choices))  # TO STORE THE NON ZERO VALUES OF EACH BOX
-
-            countR = 0
-            countC = 0
-            for image in boxes:
-                totalPixels = cv2.countNonZero(image)
-                myPixelVal[countR][countC] = totalPixels
-                countC += 1
-                if countC == choices:
-                    countC = 0
-                    countR += 1
-
-            # FIND THE USER ANSWERS
-            for x in range(0, questions):
-                arr = myPixelVal[x]
-                maxVal = np.max(arr)
-                abs_threshold = 500  # ignore small smudges
-                rel_threshold = 0.8 * maxVal  # bubble must be ≥80% of the darkest one
-
-                # bubbles that are strongly filled
-                selected = [i for i, val in enumerate(arr) if val >= rel_threshold and val > abs_threshold]
-
-                if len(selected) == 1:
-                    # ✅ Valid single answer
-                    myIndex.append(selected[0])
-                elif len(selected) > 1:
-                    # ⚠️ Multiple filled bubbles
-                    myIndex.append(-1)
-                    print("select incorrect ",selected)
-                else:
-                    # ⭕ Blank
-                    myIndex.append(-2)
-
-            print("Student Answers:", myIndex)
-
-            # COMPARE WITH ANSWER KEY
-            grading = []
-            correct_answers = []
-            for i in range(questions):
-                student_answer = myIndex[i]
-                correct_answer = answer_key.get(i + 1, -1) # dict starts at 1
-                correct_answers.append(correct_answer)
-                if student_answer == correct_answer:
-                    grading.append(1)
-                else:
-                    grading.append(0)
-            score = (sum(grading) / questions) * 100
-            print("SCORE:", score)
-
-
-            # DISPLAYING ANSWERS
-            utlis.showAnswers(imgWarpColored, myIndex, grading, correct_answers,questions,choices)  # DRAW DETECTED ANSWERS
-            utlis.drawGrid(imgWarpColored)  # DRAW GRID
-            imgRawDrawings = np.zeros_like(imgWarpColored)  # NEW BLANK IMAGE WITH WARP IMAGE SIZE
-            utlis.showAnswers(imgRawDrawings, myIndex, grading, correct_answers,questions, choices)  # DRAW ON NEW IMAGE
-            invMatrix = cv2.getPerspectiveTransform(pts2, pts1)  # INVERSE TRANSFORMATION MATRIX
-            imgInvWarp = cv2.warpPerspective(imgRawDrawings, invMatrix, (widthImg, heightImg))  # INV IMAGE WARP
-
-            # DISPLAY GRADE
-            imgRawGrade = np.zeros_like(imgGradeDisplay, np.uint8)  # NEW BLANK IMAGE WITH GRADE AREA SIZE
-            cv2.putText(imgRawGrade, str(int(score)) + "%", (70, 100)
-                        , cv2.FONT_HERSHEY_COMPLEX, 3, (0, 255, 255), 3)  # ADD THE GRADE TO NEW IMAGE
-            invMatrixG = cv2.getPerspectiveTransform(ptsG2, ptsG1)  # INVERSE TRANSFORMATION MATRIX
-            imgInvGradeDisplay = cv2.warpPerspective(imgRawGrade, invMatrixG, (widthImg, heightImg))  # INV IMAGE WARP
-
-            # SHOW ANSWERS AND GRADE ON FINAL IMAGE
-            imgFinal = cv2.addWeighted(imgFinal, 1, imgInvWarp, 1, 0)
-            imgFinal = cv2.addWeighted(imgFinal, 1, imgInvGradeDisplay, 1, 0)
+    if len(rectCon) < 1:
+        return None
+    biggestPoints = utlis.reorder(utlis.getCornerPoints(rectCon[0]))
+    gradePoints = utlis.reorder(utlis.getCornerPoints(rectCon[1])) if len(rectCon) > 1 else None
+    return biggestPoints, gradePoints
+
 
+@dataclass
+class ScanResult:
+    """
+    Outcome of scan_sheet. answers holds the choice index per printed row
+    (-1 multiple marks, -2 blank), score is a percentage and confidence the
+    per-row margin between the darkest and the second darkest bubble (0..1).
+    homography maps the resized frame onto the warped sheet. fill and the
+    abs_threshold it was decided with are what omr.regrade needs to grade again.
+    """
+    found: bool = False
+    answers: list = field(default_factory=list)
+    grading: list = field(default_factory=list)
+    correct: list = field(default_factory=list)
+    q_nos: list = field(default_factory=list)
+    score: float = 0.0
+    fill: np.ndarray = None
+    confidence: np.ndarray = None
+    homography: np.ndarray = None
+    corners: np.ndarray = None
+    grade_corners: np.ndarray = None
+    warp_size: tuple = (WIDTH_IMG, HEIGHT_IMG)
+    frame_size: tuple = (WIDTH_IMG, HEIGHT_IMG)  # image the corners and homography refer to
+    abs_threshold: float = 500
+
+    def letters(self):
+        return utlis.answers_to_letters(self.answers, self.q_nos)
+
+    def grade(self, answer_key):
+        """
+        Set correct, grading and score of the detected answers against answer_key
+        (omr.grading.grade_matrix: a question without a key is never correct).
+        Without a sheet there are no answers to grade; the score stays 0.
+        """
+        self.correct = [answer_key.get(q_no, -1) for q_no in self.q_nos]
+        if not self.found:
+            self.grading, self.score = [], 0.0
+            return
+        self.grading = grade_matrix(self.answers, self.correct)[0].astype(int).tolist()
+        self.score = (sum(self.grading) / len(self.q_nos)) * 100
+
+
+def refine_corners(img, points, scale):
+    """
+    Sub-pixel corners in the full-resolution image from points found on the
+    search level. Only a small patch around each corner is converted and searched.
+    """
+    r = int(np.ceil(2 * scale)) + 3
+    refined = np.float32(points).reshape(-1, 2).copy()
+    h, w = img.shape[:2]
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.05)
+    for p in refined:
+        x0 = int(min(max(p[0] - 2 * r, 0), w - 1))
+        y0 = int(min(max(p[1] - 2 * r, 0), h - 1))
+        patch = img[y0:y0 + 4 * r + 1, x0:x0 + 4 * r + 1]
+        local = np.float32([[p[0] - x0, p[1] - y0]])
+        # cornerSubPix needs 2 * win + 5 pixels per side; near the border the window shrinks to fit
+        win = min(r, (min(patch.shape[:2]) - 5) // 2)
+        if win < 2 or not (0 <= local[0, 0] < patch.shape[1] and 0 <= local[0, 1] < patch.shape[0]):
+            continue  # too close to the border to search
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        cv2.cornerSubPix(patch, local, (win, win), (-1, -1), criteria)
+        p[:] = local[0] + (x0, y0)
+    return refined.reshape(-1, 1, 2)
+
+
+def scan_sheet(img, answer_key, layout=None, tracker=None, metrics=None, full_res=False, fiducials=False, ctx=None):
+    """
+    Detection and grading only: no drawing, no printing. Without a layout the
+    sheet is the legacy 5x5 grid with a grade box; with a compiled
+    omr.layout.BubbleLayout only the bubble pixels of the generated sheet are
+    sampled and the grade box is optional. With an omr.tracking.SheetTracker the
+    corners of the previous frame are followed instead of searching again.
+    metrics is an omr.metrics.Metrics (or anything with stage() and count());
+    by default the process-wide omr.metrics.active is used, if one is configured.
+    With full_res the sheet is still searched on the small 600x400 level, but the
+    corners are refined to sub-pixel accuracy in the original image and the sheet
+    is warped straight from it, so bubbles are read at full detail. The search
+    itself costs the same; refining and warping from the big image do not come
+    free (about 1.6x the time per sheet on 1600x1200 photos).
+    With fiducials (layout only) the corner markers of the generated sheet are
+    located first and mapped onto their layout positions; sheets without markers
+    fall back to the tracker and the contour search.
+    With an omr.buffers.PipelineContext the working images are written into its
+    preallocated buffers instead of new arrays (one context per thread).
+    """
+    if layout is None:
+        questions = len(answer_key)
+        choices = len(answer_key)
+        q_nos = list(range(1, questions + 1))
+        warpW, warpH = WIDTH_IMG, HEIGHT_IMG
+    else:
+        questions, choices, q_nos = layout.questions, layout.choices, layout.q_nos
+        warpW, warpH = layout.warp_size
+    result = ScanResult(q_nos=q_nos, warp_size=(warpW, warpH))
+    if layout is not None:
+        result.abs_threshold = layout.abs_threshold
+    if metrics is None:
+        metrics = omr_metrics.active
+    stage = metrics.stage if metrics is not None else _no_stage
+
+    if ctx is not None:
+        ctx.start_frame()
+    with stage("preprocess"):
+        fullImg = img
+        # the tracker keeps this frame's gray image, so it comes from a ping-pong pair
+        small = ctx.pair("small", (HEIGHT_IMG, WIDTH_IMG) + img.shape[2:]) if ctx is not None else None
+        # RESIZE IMAGE; with full_res this is only the search level, the corners are refined later
+        img = cv2.resize(img, (WIDTH_IMG, HEIGHT_IMG), dst=small)
+        if img.ndim == 3:
+            imgGray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY,
+                                   dst=ctx.pair("gray", (HEIGHT_IMG, WIDTH_IMG)) if ctx is not None else None)
+        else:
+            imgGray = img  # omr.loader decodes gray
+
+    # CORNER MARKERS, ELSE FOLLOW THE LAST CORNERS, FULL CONTOUR SEARCH ONLY WHEN TRACKING IS LOST
+    corners = None
+    marked = False
+    if fiducials and layout is not None:
+        with stage("fiducials"):
+            markers = find_fiducials(imgGray, ctx=ctx)
+        if markers is not None:
+            corners, marked = (markers, None), True
+    if corners is None:
+        with stage("contours"):
+            corners = tracker.track(imgGray) if tracker is not None else None
+            if corners is None:
+                corners = find_sheet(imgGray, stage, ctx)
+                if corners is not None and tracker is not None:
+                    tracker.start(imgGray, *corners)
+    if corners is None or (corners[1] is None and layout is None):  # the legacy sheet needs its grade box
+        if metrics is not None:
+            metrics.count("no_sheet")
+        return result
+    biggestPoints, gradePoints = corners
+    getTransform = tracker.homography if tracker is not None and not marked else _perspective
+    refine = refine_fiducials if marked else refine_corners
+    source = imgGray
+    if full_res:
+        with stage("refine"):
+            frameH, frameW = fullImg.shape[:2]
+            scale = np.float32([frameW / WIDTH_IMG, frameH / HEIGHT_IMG])
+            biggestPoints = refine(fullImg, np.float32(biggestPoints) * scale, scale.max())
+            if gradePoints is not None:
+                gradePoints = refine_corners(fullImg, np.float32(gradePoints) * scale, scale.max())
+            source = fullImg
+            result.frame_size = (frameW, frameH)
+
+    with stage("warp"):
+        # WARP MAIN OMR
+        pts1 = np.float32(biggestPoints)
+        if marked:
+            pts2 = layout.fiducials  # marker centers, not the page corners
+        else:
+            pts2 = np.float32([[0, 0], [warpW, 0], [0, warpH], [warpW, warpH]])
+        matrix = getTransform("sheet", pts1, pts2)
+        buf = ctx.buf if ctx is not None else (lambda name, shape, dtype=None: None)
+        imgWarpGray = cv2.warpPerspective(source, matrix, (warpW, warpH),
+                                          dst=buf("warp", (warpH, warpW) + source.shape[2:]))
+        if imgWarpGray.ndim == 3:
+            imgWarpGray = cv2.cvtColor(imgWarpGray, cv2.COLOR_BGR2GRAY,
+                                       dst=buf("warpGray", (warpH, warpW)))  # only the warped pixels
+
+    with stage("threshold"):
+        # APPLY THRESHOLD
+        imgThresh = cv2.threshold(imgWarpGray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+                                  dst=buf("thresh", (warpH, warpW)))[1]
+
+    # FIND THE USER ANSWERS
+    with stage("fill"):
+        if layout is None:
+            myPixelVal = utlis.fillMatrix(imgThresh, questions, choices)  # FILLED PIXELS OF EACH BOX
+            myIndex = utlis.pickAnswers(myPixelVal, result.abs_threshold).tolist()
+        else:
+            myPixelVal = layout.fill(imgThresh, out=buf("bubbles", layout.index.shape))  # FILLED PIXELS UNDER EACH BUBBLE MASK
+            myIndex = utlis.pickAnswers(myPixelVal, result.abs_threshold).tolist()
+
+    # COMPARE WITH ANSWER KEY
+    with stage("grading"):
+        result.answers = myIndex
+        result.grade(answer_key)
+
+    top2 = np.sort(myPixelVal, axis=-1)[:, -2:]
+    result.found = True
+    result.fill = myPixelVal
+    result.confidence = (top2[:, 1] - top2[:, 0]) / np.maximum(top2[:, 1], 1)
+    result.homography = matrix
+    result.corners = pts1
+    result.grade_corners = np.float32(gradePoints) if gradePoints is not None else None
+    if metrics is not None:
+        metrics.count("sheets")
+        metrics.count("multi_mark_rows", myIndex.count(-1))
+        metrics.count("blank_rows", myIndex.count(-2))
+    return result
+
+
+def _warp_marks(result, layout=None):
+    # bubble centers, bubble radius and row line ends in warped-sheet pixels
+    warpW, warpH = result.warp_size
+    if layout is not None:
+        centers = layout.centers
+        radius = layout.radius
+        rowEnds = np.stack([centers[:, 0], centers[:, -1]], axis=1)
+    else:
+        questions = choices = len(result.answers)
+        secW, secH = warpW / choices, warpH / questions
+        xs = (np.arange(choices) + 0.5) * secW
+        ys = (np.arange(questions) + 0.5) * secH
+        centers = np.stack(np.meshgrid(xs, ys), axis=-1)
+        radius = 0.4 * min(secW, secH)
+        rowEnds = np.stack([np.stack([np.zeros_like(ys), ys], -1), np.stack([np.full_like(ys, warpW), ys], -1)], axis=1)
+    return np.float32(centers), radius, np.float32(rowEnds)
 
 
+def render_overlay(img, result, layout=None):
+    """
+    Draw a ScanResult onto a copy of the (resized) frame it came from. Only the
+    mark positions are projected back through the inverse homography, so the
+    cost depends on the number of marks, not on the image size.
+    """
+    img = cv2.resize(img, (WIDTH_IMG, HEIGHT_IMG))
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if not result.found:
+        cv2.putText(img, "! No OMR Sheet detected!", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        return img
+
+    # PROJECT CENTERS, RADIUS PROBES AND ROW ENDS IN ONE CALL
+    centers, radius, rowEnds = _warp_marks(result, layout)
+    n = centers.shape[0] * centers.shape[1]
+    pts = np.concatenate([centers.reshape(-1, 2), (centers + (radius, 0)).reshape(-1, 2), rowEnds.reshape(-1, 2)])
+    # INVERSE TRANSFORMATION MATRIX, then down to the 600x400 preview if the frame was bigger
+    toPreview = np.diag([WIDTH_IMG / result.frame_size[0], HEIGHT_IMG / result.frame_size[1], 1])
+    invMatrix = toPreview @ np.linalg.inv(result.homography)
+    proj = cv2.perspectiveTransform(pts.reshape(-1, 1, 2), invMatrix).reshape(-1, 2)
+    frameCenters = proj[:n].reshape(centers.shape)
+    frameRadii = np.linalg.norm(proj[n:2 * n] - proj[:n], axis=1).reshape(centers.shape[:2])
+    frameRowEnds = proj[2 * n:].reshape(rowEnds.shape)
+    utlis.drawAnswers(img, frameCenters, frameRadii, frameRowEnds, result.answers, result.grading, result.correct)
+
+    # DISPLAY GRADE
+    text = str(int(result.score)) + "%"
+    if result.grade_corners is not None:
+        # anchor (70, 100) of the 325x150 grade box, font scaled to the box width
+        ptsG2 = np.float32([[0, 0], [325, 0], [0, 150], [325, 150]])
+        gradeCorners = result.grade_corners.reshape(4, 2) * np.float32(toPreview.diagonal()[:2])
+        invMatrixG = cv2.getPerspectiveTransform(ptsG2, gradeCorners)
+        anchor = cv2.perspectiveTransform(np.float32([[[70, 100]]]), invMatrixG)[0, 0]
+        boxW = np.linalg.norm(gradeCorners[1] - gradeCorners[0])
+        scale = 3 * boxW / 325
+        cv2.putText(img, text, (int(anchor[0]), int(anchor[1])),
+                    cv2.FONT_HERSHEY_COMPLEX, scale, (0, 255, 255), max(int(scale), 1))
+    else:
+        cv2.putText(img, text, (20, 40), cv2.FONT_HERSHEY_COMPLEX, 1, (0, 255, 255), 2)
+    return img
+
+
+def scan_frame(img, answer_key, layout=None, tracker=None, render=True, fiducials=False, ctx=None):
+    """
+    scan_sheet plus the annotated frame, for the camera and image viewers.
+    Returns (imgFinal, ScanResult); imgFinal is None when render is False.
+    Errors are printed and give a not-found result. imgFinal is always a new
+    array (it is handed to the display thread), only detection uses ctx.
+    """
+    imgFinal = None
+    try:
+        result = scan_sheet(img, answer_key, layout, tracker, fiducials=fiducials, ctx=ctx)
+        if render:
+            if omr_metrics.active is not None:
+                with omr_metrics.active.stage("render"):
+                    imgFinal = render_overlay(img, result, layout)
+            else:
+                imgFinal = render_overlay(img, result, layout)
     except Exception as e:
         print("Error in detect_bubbles:", e)
+        traceback.print_exc()
+        if omr_metrics.active is not None:
+            omr_metrics.active.count("errors")
+        return (cv2.resize(img, (WIDTH_IMG, HEIGHT_IMG)) if render else None), ScanResult()
+    return imgFinal, result
 
-    return imgFinal,score,myIndex
 
-def realtime_scan(student_id, answer_key):
+def detect_bubbles(img, answer_key, layout=None, tracker=None, render=True, fiducials=False):
+    """scan_frame as (imgFinal, score, myIndex)."""
+    imgFinal, result = scan_frame(img, answer_key, layout, tracker, render, fiducials)
+    return imgFinal, result.score, result.answers
+
+def realtime_scan(student_id, answer_key, layout=None, track=True):
+    """
+    Camera scan, press 'c' to capture or 'q' to quit. Returns (answers, score,
+    ScanResult); score is -1 and the result None when nothing was captured.
+    """
     cap = cv2.VideoCapture(1)
     if not cap.isOpened():
         print("❌ Cannot access camera!")
-        return {}, 0
+        return {}, 0, None
 
     print(f"📷 Camera started for Student ID: {student_id}")
     student_answers = {}
     captured = False  # To track if answers were captured
+    tracker = SheetTracker() if track else None  # reuse the sheet corners between frames
 
     while True:
         ret, frame = cap.read()
         if not ret:
             break
 
-        frame, score, myIndex = detect_bubbles(frame, answer_key)
-
-        # Convert list to dict with question numbers starting from 1
-        answers = {i + 1: ans for i, ans in enumerate(myIndex)}
+        frame, result = scan_frame(frame, answer_key, layout, tracker)
 
-        # Map numeric index to letters
-        index_to_letter = {0: "A", 1: "B", 2: "C", 3: "D", 4: "E"}
-
-        # Apply mapping
-        answers = {q_no: index_to_letter.get(ans, "-") for q_no, ans in answers.items()}
+        # Map numeric index to letters, question numbers starting from 1
+        answers = utlis.answers_to_letters(result.answers, layout.q_nos if layout is not None else None)
 
         # Show frame
         cv2.imshow("OMR Realtime Scan - Press 'c' to capture, 'q' to quit", frame)
@@ -178,33 +379,37 @@ def realtime_scan(student_id, answer_key):
 
     # Calculate score only if captured
     if captured:
-        score = (score / 100) * len(answer_key)
+        score = (result.score / 100) * len(answer_key)
         print(f"✅ Scan complete for Student {student_id}: Score {score}/{len(answer_key)}")
     else:
         score = -1
+        result = None
 
-    return student_answers, score
+    return student_answers, score, result
 
 
-def scan_image(file_path):
+def scan_image(file_path, answer_key, show=True, layout=None):
     """
     Detect bubbles on a saved OMR sheet image (instead of realtime camera).
+    Returns (answers, score, ScanResult) like realtime_scan; score is -1 and
+    the result None if no sheet was found.
     """
-    img = cv2.imread(file_path)
+    img = read_image(file_path)  # gray, decoded no bigger than the search level needs
     if img is None:
         raise FileNotFoundError(f"Image not found: {file_path}")
 
-    frame, filled_bubbles = detect_bubbles(img)
-
-    cv2.imshow("OMR Image Scan - Press any key to close", frame)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    frame, result = scan_frame(img, answer_key, layout, render=show)
 
-    # Dummy answers (extend later with mapping)
-    student_answers = {i+1: "A" for i in range(10)}
-    score = sum(1 for v in student_answers.values() if v == "A")
+    if show:
+        cv2.imshow("OMR Image Scan - Press any key to close", frame)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
 
-    print(f"✅ Image scan complete. Score: {score}/10")
-    return student_answers, score
+    if not result.answers:
+        return {}, -1, None
 
+    student_answers = utlis.answers_to_letters(result.answers, layout.q_nos if layout is not None else None)
+    score = (result.score / 100) * len(answer_key)
 
+    print(f"✅ Image scan complete. Score: {score}/{len(answer_key)}")
+    return student_answers, score, result
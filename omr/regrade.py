@@ -0,0 +1,82 @@
+# omr/regrade.py
+"""
+Grade stored scans again after the key or the thresholds change. Only the fill
+matrices kept in the results store are used, no image is read.
+
+    python -m omr.regrade                                   # key from the question bank
+    python -m omr.regrade --exam midterm --dry-run
+    python -m omr.regrade --abs-threshold 40 --rel-threshold 0.7
+"""
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+from omr import utlis
+from omr.grading import grade_matrix
+from omr.store import DB_PATH, open_store
+
+
+def regrade(scans, answer_key, abs_threshold=None, rel_threshold=0.8):
+    """
+    New (result_id, answers, score, total) for rows of ResultStore.scans().
+    Scans with the same printed question order are stacked and decided as one
+    (N, Q, C) array; abs_threshold None keeps the threshold each scan was read with.
+    Scores follow scan_sheet: correct rows / printed rows, scaled to len(answer_key).
+    """
+    groups = defaultdict(list)
+    for row in scans:
+        _, _, q_nos, fill, _ = row
+        groups[(q_nos.tobytes(), fill.shape)].append(row)
+
+    total = len(answer_key)
+    updates = []
+    for rows in groups.values():
+        q_nos = rows[0][2]
+        fills = np.stack([r[3] for r in rows])
+        if abs_threshold is None:
+            thresholds = np.float32([r[4] for r in rows])[:, None, None]
+        else:
+            thresholds = abs_threshold
+        myIndex = utlis.pickAnswers(fills, thresholds, rel_threshold)  # (N, Q)
+
+        key = np.array([answer_key.get(int(q), -1) for q in q_nos])
+        percent = grade_matrix(myIndex, key)[1] / len(q_nos) * 100
+        scores = percent / 100 * total  # same arithmetic as scan_image, unchanged sheets keep their exact score
+
+        # -2 blank / -1 multiple -> "-", like answers_to_letters
+        letters = np.array(["-", "-"] + [utlis.INDEX_TO_LETTER.get(c, "-") for c in range(fills.shape[-1])])
+        q_list = q_nos.tolist()
+        for row, picked, score in zip(rows, letters[myIndex + 2].tolist(), scores.tolist()):
+            updates.append((row[0], dict(zip(q_list, picked)), score, total))
+    return updates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regrade stored scans against the current answer key.")
+    parser.add_argument("-q", "--questions", default=None,
+                        help="a questions.json (default: the question bank, data/questions.db)")
+    parser.add_argument("-l", "--layout", default="data/layout.json")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--exam", default=None, help="only this exam (default: all)")
+    parser.add_argument("--abs-threshold", type=float, default=None,
+                        help="filled pixels a mark needs (default: what each scan used)")
+    parser.add_argument("--rel-threshold", type=float, default=0.8,
+                        help="fraction of the darkest bubble in the row a mark needs")
+    parser.add_argument("--dry-run", action="store_true", help="report the changes, write nothing")
+    args = parser.parse_args(argv)
+
+    answer_key = utlis.load_answer_key(args.questions, args.layout)
+    with open_store(args.db) as store:
+        scans = store.scans(args.exam)
+        updates = regrade(scans, answer_key, args.abs_threshold, args.rel_threshold)
+        old = {rid: score for rid, score, *_ in scans}
+        changed = sum(1 for rid, _, score, _ in updates if not np.isclose(score, old[rid]))
+        if not args.dry_run:
+            store.update_grades(updates)
+    print(f"✅ Regraded {len(updates)} scans, {changed} scores changed"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
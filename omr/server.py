@@ -0,0 +1,328 @@
+# omr/server.py
+"""
+Local HTTP grading service. Phones and other machines post photos, a pool of
+worker processes (answer key and layout loaded once per process) grades them.
+Standard library only, nothing else has to run.
+
+    python -m omr.server --fiducials -j 4                # http://127.0.0.1:8765/
+    python -m omr.server --host 0.0.0.0 --exam midterm   # reachable from the LAN
+
+    GET  /         upload form (several photos at once, works from a phone browser)
+    GET  /health   workers, sheets in flight, totals
+    GET  /items    item analysis (omr.grading) of the sheets graded so far
+    POST /grade    one image: the raw file as the body, or one multipart file
+                   (?student=NAME&overlay=1)
+    POST /batch    several images: multipart/form-data files, or JSON
+                   {"images": [{"name": ..., "data": <base64>}], "overlay": false}
+
+Each sheet comes back as {"student", "found", "answers": {q_no: letter},
+"score", "total", "percent", "blank", "multiple"}, plus "overlay" (a base64
+JPEG of the annotated photo) when asked for; /batch returns {"sheets": [...]}.
+At most --max-queue sheets are accepted at a time. A request that doesn't fit
+gets 503 with Retry-After, so a load spike waits on the clients instead of
+piling up in memory here.
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+from omr import batch, utlis
+from omr.batch import _init_service_worker, add_grading_args, grade_image, grading_layout_path
+from omr.grading import CohortGrader, stats_json
+from omr.loader import decode_image
+from omr.processor import render_overlay
+from omr.store import DB_PATH, open_store
+
+UPLOAD_FORM = b"""<!doctype html>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>OMR grading</title>
+<h2>Grade OMR sheets</h2>
+<form method="post" action="/batch" enctype="multipart/form-data">
+  <p><input type="file" name="sheet" accept="image/*" multiple required></p>
+  <p><label><input type="checkbox" name="overlay" value="1"> annotated images</label></p>
+  <p><button>Grade</button></p>
+</form>
+"""
+
+
+class QueueFull(Exception):
+    pass
+
+
+def grade_upload(data, overlay=False):
+    """Grade one encoded image inside a worker. Returns (sheet dict, ScanResult if the sheet was found)."""
+    img = decode_image(data, batch._full_res, gray=not overlay)
+    answers, score, result = grade_image(img)
+    sheet = {"found": score != -1, "answers": answers, "score": score if score != -1 else None,
+             "total": len(batch._answer_key)}
+    if img is None:
+        sheet["error"] = "not an image"
+    elif result is None:
+        sheet["error"] = "grading failed"
+    elif result.found:
+        q_nos = [int(q) for q in result.q_nos]
+        sheet["percent"] = round(result.score, 2)
+        sheet["blank"] = [q for q, a in zip(q_nos, result.answers) if a == -2]
+        sheet["multiple"] = [q for q, a in zip(q_nos, result.answers) if a == -1]
+    if overlay and result is not None:
+        ok, jpg = cv2.imencode(".jpg", render_overlay(img, result, batch._layout), [cv2.IMWRITE_JPEG_QUALITY, 80])
+        sheet["overlay"] = base64.b64encode(jpg.tobytes()).decode("ascii") if ok else None
+    return sheet, result if sheet["found"] else None
+
+
+class GradingService:
+    """
+    The warm worker pool plus admission control. grade() takes all images of a
+    request or none of them (QueueFull), so a batch is never half graded. A
+    sheet counts as in flight until its worker is done with it, even when the
+    request gave up waiting.
+    """
+
+    def __init__(self, answer_key, workers=None, layout_path=None, full_res=False, fiducials=False,
+                 max_queue=None, timeout=60.0, exam=None, db_path=DB_PATH):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or 4 * self.workers
+        self.timeout = timeout
+        self.exam = exam
+        self.store = open_store(db_path) if exam is not None else None
+        self.cohort = CohortGrader.for_key(answer_key)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.graded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.time()
+        self.pool = Pool(self.workers, initializer=_init_service_worker,
+                         initargs=(answer_key, layout_path, False, full_res, fiducials))
+
+    def _finished(self, _):
+        with self._lock:
+            self.in_flight -= 1
+
+    def grade(self, uploads, overlay=False):
+        """uploads is [(student, image bytes)]; returns one sheet dict per upload, in order."""
+        n = len(uploads)
+        with self._lock:
+            if self.in_flight + n > self.max_queue:
+                self.rejected += n
+                raise QueueFull(f"{self.in_flight} sheets in flight, room for {self.max_queue - self.in_flight}")
+            self.in_flight += n
+        jobs = [self.pool.apply_async(grade_upload, (data, overlay),
+                                      callback=self._finished, error_callback=self._finished)
+                for _, data in uploads]
+
+        deadline = time.monotonic() + self.timeout
+        sheets = []
+        for (student, _), job in zip(uploads, jobs):
+            try:
+                sheet, result = job.get(max(deadline - time.monotonic(), 0))
+            except multiprocessing.TimeoutError:
+                raise
+            except Exception as e:
+                sheet, result = {"found": False, "answers": {}, "score": None, "error": str(e)}, None
+            sheet = {"student": student, **sheet}
+            with self._lock:
+                if sheet["found"]:
+                    self.graded += 1
+                    self.cohort.add_result(result)
+                    if self.store is not None:
+                        self.store.insert_result(student, sheet["answers"], sheet["score"], sheet["total"],
+                                                 self.exam, result)
+                else:
+                    self.failed += 1
+            sheets.append(sheet)
+        return sheets
+
+    def health(self):
+        with self._lock:
+            return {"workers": self.workers, "in_flight": self.in_flight, "max_queue": self.max_queue,
+                    "graded": self.graded, "failed": self.failed, "rejected": self.rejected,
+                    "exam": self.exam, "uptime_s": round(time.time() - self.started, 1)}
+
+    def items(self):
+        with self._lock:
+            return stats_json(self.cohort.stats(), self.cohort.q_nos)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        if self.store is not None:
+            self.store.close()
+
+
+def parse_uploads(body, content_type):
+    """
+    ([(name, image bytes)], {field: value}) of a request body: multipart files
+    (name = file name without extension), JSON {"images": [...]}, or the raw
+    image itself (name None).
+    """
+    if content_type.startswith("multipart/form-data"):
+        msg = BytesParser(policy=policy.HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+        if not msg.is_multipart():
+            raise ValueError("malformed multipart body")
+        files, fields = [], {}
+        for part in msg.iter_parts():
+            data = part.get_payload(decode=True) or b""
+            filename = part.get_filename()
+            if filename:
+                files.append((os.path.splitext(os.path.basename(filename))[0], data))
+            else:
+                fields[part.get_param("name", header="content-disposition")] = data.decode("utf-8", "replace")
+        return files, fields
+    if content_type.startswith("application/json"):
+        req = json.loads(body)
+        if not isinstance(req, dict) or not isinstance(req.get("images"), list):
+            raise ValueError('expected {"images": [...]}')
+        files = []
+        for img in req["images"]:
+            if not isinstance(img, dict) or not isinstance(img.get("data"), str) \
+                    or not isinstance(img.get("name"), (str, type(None))):
+                raise ValueError('every image must be {"name": ..., "data": <base64>}')
+            files.append((img["name"], base64.b64decode(img["data"], validate=True)))
+        return files, {k: v for k, v in req.items() if k != "images"}
+    return [(None, body)], {}
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def make_handler(service, max_bytes, quiet=False):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type="application/json", headers=()):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message, headers=()):
+            self._send(status, {"error": message}, headers=headers)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/":
+                self._send(200, UPLOAD_FORM, "text/html; charset=utf-8")
+            elif path == "/health":
+                self._send(200, service.health())
+            elif path == "/items":
+                self._send(200, service.items())
+            else:
+                self._error(404, "not found")
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path not in ("/grade", "/batch"):
+                self._error(404, "not found")
+                return
+            length = self.headers.get("Content-Length")
+            if length is None:
+                self._error(411, "Content-Length required")
+                return
+            try:
+                length = int(length)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._error(400, f"bad Content-Length: {self.headers['Content-Length']!r}")
+                return
+            if length > max_bytes:
+                self._error(413, f"request larger than {max_bytes // 2 ** 20} MB")
+                return
+            body = self.rfile.read(length)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                files, fields = parse_uploads(body, self.headers.get("Content-Type", ""))
+            except (ValueError, KeyError, TypeError) as e:
+                self._error(400, f"cannot read the upload: {e}")
+                return
+            if not files:
+                self._error(400, "no image in the request")
+                return
+            if url.path == "/grade" and len(files) != 1:
+                self._error(400, "/grade takes one image, use /batch for several")
+                return
+            if len(files) > service.max_queue:
+                self._error(413, f"at most {service.max_queue} images per request")
+                return
+
+            student = query.get("student")
+            uploads = [(student if url.path == "/grade" and student else name or f"sheet{i}", data)
+                       for i, (name, data) in enumerate(files, start=1)]
+            start = time.perf_counter()
+            try:
+                sheets = service.grade(uploads, _flag(query.get("overlay", fields.get("overlay", ""))))
+            except QueueFull as e:
+                self._error(503, f"busy: {e}", headers=[("Retry-After", "1")])
+                return
+            except multiprocessing.TimeoutError:
+                self._error(504, f"not graded within {service.timeout:.0f}s")
+                return
+            elapsed = time.perf_counter() - start
+            if not quiet:
+                found = sum(s["found"] for s in sheets)
+                print(f"✅ {self.client_address[0]}: {found}/{len(sheets)} sheets graded in {elapsed:.2f}s")
+            self._send(200, sheets[0] if url.path == "/grade" else {"sheets": sheets, "seconds": round(elapsed, 3)})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class GradingServer(ThreadingHTTPServer):
+    request_queue_size = 128  # the default 5 drops connections of a classroom posting at once
+
+
+def serve(answer_key, host="127.0.0.1", port=8765, max_mb=50, quiet=False, **service_args):
+    service = GradingService(answer_key, **service_args)
+    server = GradingServer((host, port), make_handler(service, max_mb * 2 ** 20, quiet))
+    print(f"🌐 Grading on http://{host}:{port}/ ({service.workers} workers, "
+          f"up to {service.max_queue} sheets queued) - Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("⏹ Stopped")
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade OMR photos posted over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept phones on the LAN")
+    parser.add_argument("--port", type=int, default=8765)
+    add_grading_args(parser)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--max-queue", type=int, default=None,
+                        help="sheets accepted at once before answering 503 (default: four per worker)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds a request waits for its sheets")
+    parser.add_argument("--max-mb", type=int, default=50, help="largest request body")
+    parser.add_argument("--quiet", action="store_true", help="no line per request")
+    args = parser.parse_args(argv)
+
+    answer_key = utlis.load_answer_key(args.questions, args.layout)
+    serve(answer_key, args.host, args.port, args.max_mb, args.quiet, workers=args.workers,
+          layout_path=grading_layout_path(args), full_res=args.full_res,
+          fiducials=args.fiducials, max_queue=args.max_queue, timeout=args.timeout,
+          exam=args.exam, db_path=args.db)
+
+
+if __name__ == "__main__":
+    main()
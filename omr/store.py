@@ -0,0 +1,293 @@
+# omr/store.py
+"""
+SQLite results store (results/results.db), replacing the append-only results.csv.
+
+Every scan is one row in `results`; the detected answers are kept per question
+in `answers` so they stay typed and queryable. Student and exam lookups are indexed.
+`scans` keeps the raw fill matrix and homography of a result as packed arrays,
+so omr.regrade can grade the cohort again without the images.
+"""
+import ast
+import csv
+import os
+import sqlite3
+
+import numpy as np
+
+DB_PATH = "results/results.db"
+LEGACY_CSV = "results/results.csv"  # what the app wrote before the store, next to DB_PATH
+DEFAULT_EXAM = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exams (
+    id      INTEGER PRIMARY KEY,
+    name    TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY,
+    student     TEXT NOT NULL,
+    exam_id     INTEGER NOT NULL REFERENCES exams(id),
+    score       REAL NOT NULL,
+    total       INTEGER NOT NULL,
+    scanned_at  TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS answers (
+    result_id   INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    q_no        INTEGER NOT NULL,
+    answer      TEXT NOT NULL,
+    PRIMARY KEY (result_id, q_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scans (
+    result_id       INTEGER PRIMARY KEY REFERENCES results(id) ON DELETE CASCADE,
+    q_nos           BLOB NOT NULL,  -- int32 (questions,) printed order
+    fill            BLOB NOT NULL,  -- uint16 (questions, choices) filled pixels per bubble
+    choices         INTEGER NOT NULL,
+    abs_threshold   REAL NOT NULL,
+    homography      BLOB            -- float32 (3, 3) frame -> warped sheet
+);
+CREATE INDEX IF NOT EXISTS idx_results_student ON results(student);
+CREATE INDEX IF NOT EXISTS idx_results_exam ON results(exam_id, student);
+CREATE INDEX IF NOT EXISTS idx_results_score ON results(score);
+"""
+
+LETTER_INDEX = {letter: i for i, letter in enumerate("ABCDE")}  # utlis.LETTER_TO_INDEX, "-" is -2
+ORDER_COLUMNS = {"id": "r.id", "student": "r.student", "score": "r.score", "scanned_at": "r.scanned_at"}
+
+
+class ResultStore:
+    """Insert / delete / query API over results.db. Use as a context manager or call close()."""
+
+    def __init__(self, path=DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._exam_ids = {}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def exam_id(self, exam=DEFAULT_EXAM):
+        if exam not in self._exam_ids:
+            self.conn.execute("INSERT OR IGNORE INTO exams(name) VALUES (?)", (exam,))
+            self._exam_ids[exam] = self.conn.execute("SELECT id FROM exams WHERE name = ?", (exam,)).fetchone()[0]
+        return self._exam_ids[exam]
+
+    # ---- writes ----
+    def insert_result(self, student, answers, score, total, exam=DEFAULT_EXAM, scan=None):
+        """Store one scan; answers is {q_no: letter}. Returns the result id."""
+        return self.insert_many([(student, answers, score, total, scan)], exam)[0]
+
+    def insert_many(self, rows, exam=DEFAULT_EXAM):
+        """
+        Store (student, answers, score, total[, scan]) rows in one transaction.
+        scan is the omr.processor.ScanResult the answers came from (or None);
+        its fill matrix is kept for regrading. Returns the result ids.
+        """
+        ids = []
+        with self.conn:
+            exam_id = self.exam_id(exam)
+            for student, answers, score, total, *scan in rows:
+                cur = self.conn.execute(
+                    "INSERT INTO results(student, exam_id, score, total) VALUES (?, ?, ?, ?)",
+                    (student, exam_id, float(score), int(total)))
+                ids.append(cur.lastrowid)
+                self._write_answers(cur.lastrowid, answers)
+                if scan and scan[0] is not None and scan[0].fill is not None:
+                    self.conn.execute(
+                        "INSERT INTO scans(result_id, q_nos, fill, choices, abs_threshold, homography) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", _pack_scan(cur.lastrowid, scan[0]))
+        return ids
+
+    def update_grades(self, rows):
+        """Rewrite (result_id, answers, score, total) of existing results in one transaction."""
+        with self.conn:
+            for rid, answers, score, total in rows:
+                self.conn.execute("UPDATE results SET score = ?, total = ? WHERE id = ?",
+                                  (float(score), int(total), int(rid)))
+                self.conn.execute("DELETE FROM answers WHERE result_id = ?", (int(rid),))
+                self._write_answers(rid, answers)
+
+    def _write_answers(self, rid, answers):
+        self.conn.executemany(
+            "INSERT INTO answers(result_id, q_no, answer) VALUES (?, ?, ?)",
+            [(int(rid), int(q_no), str(a)) for q_no, a in answers.items()])
+
+    def delete(self, result_ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM results WHERE id = ?", [(int(i),) for i in result_ids])
+
+    def clear(self, exam=None):
+        with self.conn:
+            if exam is None:
+                self.conn.execute("DELETE FROM results")
+            else:
+                self.conn.execute("DELETE FROM results WHERE exam_id = ?", (self.exam_id(exam),))
+
+    # ---- reads ----
+    def query(self, student=None, exam=None, order_by="id", descending=False, limit=None, offset=0,
+              name_like=None, min_score=None, max_score=None, after_id=None):
+        """
+        Result rows (id, student, exam, score, total, scanned_at) filtered by
+        student name (exact or substring), exam, score range and/or id > after_id,
+        sorted and paged by SQLite.
+        """
+        where, params = self._where(student, exam, name_like, min_score, max_score, after_id)
+        direction = "DESC" if descending else "ASC"
+        order = f"{ORDER_COLUMNS[order_by]} {direction}"
+        if order_by != "id":
+            order += f", r.id {direction}"  # ties (same score / name) keep one order across pages
+        sql = ("SELECT r.id, r.student, e.name, r.score, r.total, r.scanned_at "
+               "FROM results r JOIN exams e ON e.id = r.exam_id" + where + " ORDER BY " + order)
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+        return self.conn.execute(sql, params).fetchall()
+
+    def count(self, student=None, exam=None, name_like=None, min_score=None, max_score=None, after_id=None):
+        where, params = self._where(student, exam, name_like, min_score, max_score, after_id)
+        return self.conn.execute("SELECT COUNT(*) FROM results r" + where, params).fetchone()[0]
+
+    def answers(self, result_id):
+        rows = self.conn.execute("SELECT q_no, answer FROM answers WHERE result_id = ? ORDER BY q_no", (result_id,))
+        return dict(rows.fetchall())
+
+    def answers_for(self, result_ids):
+        """{result_id: {q_no: letter}} for many results in one query."""
+        out = {int(i): {} for i in result_ids}
+        if not out:
+            return out
+        marks = ",".join("?" * len(out))
+        for rid, q_no, a in self.conn.execute(
+                f"SELECT result_id, q_no, answer FROM answers WHERE result_id IN ({marks}) ORDER BY result_id, q_no",
+                list(out)):
+            out[rid][q_no] = a
+        return out
+
+    def answer_matrix(self, exam=None, q_nos=None):
+        """
+        (result_ids, q_nos, answers) for omr.grading: answers is an (N, Q) int8
+        matrix of choice indices with -2 where the stored answer is "-" or
+        missing (the letters don't tell blank from multiple marks).
+        q_nos defaults to every question number seen.
+        """
+        where, params = self._where(None, exam)
+        result_ids = np.array([r[0] for r in self.conn.execute(
+            "SELECT r.id FROM results r" + where + " ORDER BY r.id", params)], np.int64)
+        rows = self.conn.execute("SELECT a.result_id, a.q_no, a.answer FROM answers a "
+                                 "JOIN results r ON r.id = a.result_id" + where, params).fetchall()
+        ids, qs, letters = (np.array(col) for col in zip(*rows)) if rows else (np.zeros(0, np.int64),) * 3
+        q_nos = np.unique(qs) if q_nos is None else np.asarray(q_nos)
+
+        answers = np.full((len(result_ids), len(q_nos)), -2, np.int8)
+        if rows:
+            order = np.argsort(q_nos)
+            col = np.clip(np.searchsorted(q_nos, qs, sorter=order), 0, len(q_nos) - 1)
+            col = order[col]
+            known = q_nos[col] == qs  # answers to questions outside q_nos are dropped
+            uniq, inverse = np.unique(letters, return_inverse=True)
+            codes = np.array([LETTER_INDEX.get(u, -2) for u in uniq], np.int8)[inverse]
+            answers[np.searchsorted(result_ids, ids[known]), col[known]] = codes[known]
+        return result_ids, q_nos.tolist(), answers
+
+    def scans(self, exam=None):
+        """(result_id, score, q_nos, fill, abs_threshold) of every result that has a stored scan."""
+        sql = ("SELECT s.result_id, r.score, s.q_nos, s.fill, s.choices, s.abs_threshold "
+               "FROM scans s JOIN results r ON r.id = s.result_id")
+        params = []
+        if exam is not None:
+            sql += " WHERE r.exam_id = ?"
+            params.append(self.exam_id(exam))
+        out = []
+        for rid, score, q_nos, fill, choices, abs_threshold in self.conn.execute(sql + " ORDER BY s.result_id", params):
+            out.append((rid, score, np.frombuffer(q_nos, np.int32),
+                        np.frombuffer(fill, np.uint16).reshape(-1, choices), abs_threshold))
+        return out
+
+    def homography(self, result_id):
+        row = self.conn.execute("SELECT homography FROM scans WHERE result_id = ?", (int(result_id),)).fetchone()
+        return np.frombuffer(row[0], np.float32).reshape(3, 3) if row and row[0] is not None else None
+
+    def max_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()[0]
+
+    def _where(self, student, exam, name_like=None, min_score=None, max_score=None, after_id=None):
+        clauses, params = [], []
+        if student is not None:
+            clauses.append("r.student = ?")
+            params.append(student)
+        if exam is not None:
+            clauses.append("r.exam_id = ?")
+            params.append(self.exam_id(exam))
+        if name_like:
+            escaped = name_like.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("r.student LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if min_score is not None:
+            clauses.append("r.score >= ?")
+            params.append(float(min_score))
+        if max_score is not None:
+            clauses.append("r.score <= ?")
+            params.append(float(max_score))
+        if after_id is not None:
+            clauses.append("r.id > ?")
+            params.append(int(after_id))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # ---- migration ----
+    def import_csv(self, csv_path=LEGACY_CSV, exam=DEFAULT_EXAM):
+        """
+        One-time import of an old results.csv (see read_results_csv).
+        Returns the number of rows imported.
+        """
+        rows = read_results_csv(csv_path)
+        self.insert_many(rows, exam)
+        return len(rows)
+
+
+def read_results_csv(csv_path):
+    """
+    (student, answers, score, total) rows of a results CSV (Student Name,
+    Answers, Score, Total), as written by export_result and omr.batch. The
+    Answers dict repr is parsed with ast.literal_eval, never eval.
+    """
+    rows = []
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                answers = ast.literal_eval(row["Answers"]) if row["Answers"] else {}
+            except (ValueError, SyntaxError):
+                answers = {}
+            rows.append((row["Student Name"], answers, float(row["Score"] or 0), int(row["Total"] or 0)))
+    return rows
+
+
+def _pack_scan(result_id, scan):
+    fill = np.minimum(np.asarray(scan.fill), np.iinfo(np.uint16).max).astype(np.uint16)
+    homography = np.float32(scan.homography).tobytes() if scan.homography is not None else None
+    return (result_id, np.asarray(scan.q_nos, np.int32).tobytes(), fill.tobytes(), fill.shape[-1],
+            float(scan.abs_threshold), homography)
+
+
+def open_store(path=DB_PATH, legacy_csv=None):
+    """
+    Open the store, importing legacy_csv the first time the database is created.
+    Only the app's own database (DB_PATH) picks up the old results/results.csv
+    by default; any other path starts empty unless legacy_csv is given.
+    """
+    fresh = not os.path.exists(path)
+    if legacy_csv is None and os.path.abspath(path) == os.path.abspath(DB_PATH):
+        legacy_csv = LEGACY_CSV
+    store = ResultStore(path)
+    if fresh and legacy_csv and os.path.exists(legacy_csv):
+        store.import_csv(legacy_csv)
+    return store
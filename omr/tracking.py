@@ -0,0 +1,84 @@
+# omr/tracking.py
+"""
+Frame-to-frame tracking of the sheet corners for the live scanner.
+"""
+import cv2
+import numpy as np
+
+
+class SheetTracker:
+    """
+    Follows the reordered corner points of the sheet (and the grade box, if any)
+    with pyramidal Lucas-Kanade optical flow in small windows around each corner.
+    detect_bubbles only runs the full Canny/findContours search when track()
+    returns None, and the perspective matrices are reused while the sheet is still.
+    """
+
+    def __init__(self, max_error=1.0, max_frames=90, still_px=0.5, win_size=(21, 21)):
+        self.max_error = max_error  # forward-backward error (px) before tracking counts as lost
+        self.max_frames = max_frames  # force a full search now and then to stop drift
+        self.still_px = still_px  # corners moving less than this keep the cached homography
+        self.win_size = win_size
+        self.reset()
+
+    def reset(self):
+        self.prevGray = None
+        self.points = None
+        self.groups = []
+        self.frames = 0
+        self._matrices = {}
+
+    def start(self, imgGray, *corners):
+        """Start tracking after a full search. corners are (4, 1, 2) point sets or None."""
+        self.groups = [c is not None for c in corners]
+        self.points = np.float32(np.concatenate([c for c in corners if c is not None])).reshape(-1, 1, 2)
+        self.prevGray = imgGray
+        self.frames = 0
+
+    def track(self, imgGray):
+        """Corner sets for this frame in the order given to start(), or None when lost."""
+        if self.points is None or self.frames >= self.max_frames:
+            return None
+
+        lk = dict(winSize=self.win_size, maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        nextPts, status, _ = cv2.calcOpticalFlowPyrLK(self.prevGray, imgGray, self.points, None, **lk)
+        backPts, statusBack, _ = cv2.calcOpticalFlowPyrLK(imgGray, self.prevGray, nextPts, None, **lk)
+        fbError = np.abs(backPts - self.points).max()
+        if not status.all() or not statusBack.all() or fbError > self.max_error:
+            self.reset()
+            return None
+
+        corners = self._split(nextPts)
+        for c in corners:
+            # reordered as [tl, tr, bl, br]; must still be a convex quad
+            if c is not None and not cv2.isContourConvex(c[[0, 1, 3, 2]]):
+                self.reset()
+                return None
+
+        self.prevGray = imgGray
+        self.points = nextPts
+        self.frames += 1
+        return corners
+
+    def homography(self, key, src, dst):
+        """getPerspectiveTransform(src, dst), reused while the points stay within still_px."""
+        cached = self._matrices.get(key)
+        if cached is not None and cached[0].shape == src.shape and cached[1].shape == dst.shape \
+                and np.abs(cached[0] - src).max() < self.still_px \
+                and np.abs(cached[1] - dst).max() < self.still_px:
+            return cached[2]
+        matrix = cv2.getPerspectiveTransform(src, dst)
+        self._matrices[key] = (src.copy(), dst.copy(), matrix)
+        return matrix
+
+    def _split(self, points):
+        corners = []
+        i = 0
+        for present in self.groups:
+            if present:
+                corners.append(points[i:i + 4])
+                i += 4
+            else:
+                corners.append(None)
+        return corners
@@ -1,9 +1,14 @@
 # omr/utlis.py
-import csv
+import json
 import os
 import cv2
 import numpy as np
-os.makedirs("results", exist_ok=True)
+
+from omr.bank import load_answers
+from omr.store import DB_PATH, DEFAULT_EXAM, open_store
+
+LETTER_TO_INDEX = {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
+INDEX_TO_LETTER = {v: k for k, v in LETTER_TO_INDEX.items()}
 
 
 ## TO STACK ALL THE IMAGES IN ONE WINDOW
@@ -79,14 +84,32 @@ def getCornerPoints(cont):
     approx = cv2.approxPolyDP(cont, 0.02 * peri, True) # APPROXIMATE THE POLY TO GET CORNER POINTS
     return approx
 
-def splitBoxes(img):
-    rows = np.vsplit(img,5)
-    boxes=[]
-    for r in rows:
-        cols= np.hsplit(r,5)
-        for box in cols:
-            boxes.append(box)
-    return boxes
+def fillMatrix(imgThresh, questions=5, choices=5):
+    """
+    Count the filled pixels of every grid cell in one pass.
+    imgThresh is a thresholded warp (H, W) or a stack of them (N, H, W);
+    returns (questions, choices) or (N, questions, choices) counts.
+    """
+    h = imgThresh.shape[-2] // questions
+    w = imgThresh.shape[-1] // choices
+    cells = imgThresh[..., :h * questions, :w * choices]
+    cells = cells.reshape(imgThresh.shape[:-2] + (questions, h, choices, w))
+    return np.count_nonzero(cells, axis=(-3, -1))
+
+
+def pickAnswers(myPixelVal, abs_threshold=500, rel_threshold=0.8):
+    """
+    Decide every row of a fill matrix (or a stack of them) at once.
+    A bubble counts as marked when it is above abs_threshold (ignore small smudges)
+    and at least rel_threshold of the darkest bubble in its row.
+    Returns the choice index per row, -1 for multiple marks and -2 for blank.
+    """
+    myPixelVal = np.asarray(myPixelVal)
+    maxVal = myPixelVal.max(axis=-1, keepdims=True)
+    selected = (myPixelVal >= rel_threshold * maxVal) & (myPixelVal > abs_threshold)
+    count = selected.sum(axis=-1)
+    return np.where(count == 1, selected.argmax(axis=-1), np.where(count > 1, -1, -2))
+
 
 def drawGrid(img,questions=5,choices=5):
     secW = int(img.shape[1]/questions)
@@ -102,32 +125,37 @@ def drawGrid(img,questions=5,choices=5):
     return img
 
 
-def check_answers(student_answers, answer_key):
-    score = 0
-    total = 0
-    details = {}
-    for q, correct in answer_key.items():
-        total += 1
-        student_ans = student_answers.get(q, "-")
-        details[q] = {"student": student_ans, "correct": correct}
-        if student_ans == correct:
-            score += 1
-    return score, total, details
+def load_answer_key(questions_path=None, layout_path="data/layout.json"):
+    """
+    Build the numeric answer key {q_no: choice_index} in printed order.
+    questions_path is a questions.json, or None / a .db file for the question bank.
+    Falls back to every question when there is no layout.
+    """
+    if os.path.exists(layout_path):
+        with open(layout_path, "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        printed = [e["original_q_no"] for e in sorted(layout, key=lambda e: e["printed_index"])]
+        letters = load_answers(questions_path, printed)  # only the printed questions are read
+        printed = [q_no for q_no in printed if q_no in letters]
+    else:
+        letters = load_answers(questions_path)
+        printed = list(letters)
 
-def export_result(student_id, answers, score, total, file_path="results/results.csv"):
-    # Ensure the folder exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return {q_no: LETTER_TO_INDEX.get(letters[q_no], -1) for q_no in printed}
 
-    # Check if file exists to write header
-    header_needed = not os.path.exists(file_path)
 
-    with open(file_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if header_needed:
-            writer.writerow(["Student Name", "Answers", "Score", "Total"])
-        writer.writerow([student_id, str(answers), score, total])
+def answers_to_letters(myIndex, q_nos=None):
+    # {q_no: letter}, "-" for blank / multiple marks; q_no is the printed row + 1 unless given
+    if q_nos is None:
+        q_nos = range(1, len(myIndex) + 1)
+    return {q_no: INDEX_TO_LETTER.get(ans, "-") for q_no, ans in zip(q_nos, myIndex)}
 
 
+def export_result(student_id, answers, score, total, exam=DEFAULT_EXAM, db_path=DB_PATH, scan=None):
+    # one row in the results store (results/results.db), plus the raw fill matrix
+    # of the ScanResult when given (see omr.regrade); returns the result id
+    with open_store(db_path) as store:
+        return store.insert_result(student_id, answers, score, total, exam, scan)
 
 
 def showAnswers(img, myIndex, grading, ans, questions=5, choices=5):
@@ -180,3 +208,24 @@ def showAnswers(img, myIndex, grading, ans, questions=5, choices=5):
 
     return img
 
+
+
+def drawAnswers(img, centers, radii, rowEnds, myIndex, grading, ans, thickness=3):
+    """
+    Same colours as showAnswers, drawn straight onto the frame at bubble centers
+    already projected into it: centers (Q, C, 2), radii (Q, C), rowEnds (Q, 2, 2).
+    """
+    centers = np.int32(np.rint(centers))
+    rowEnds = np.int32(np.rint(rowEnds))
+    for x, myAns in enumerate(myIndex):
+        if myAns >= 0:
+            myColor = (0, 255, 0) if grading[x] == 1 else (0, 0, 255)
+            cv2.circle(img, tuple(map(int, centers[x][myAns])), max(int(radii[x][myAns]), 2), myColor, cv2.FILLED)
+        else:
+            # multiple answers or no answer: line across the row
+            cv2.line(img, tuple(map(int, rowEnds[x][0])), tuple(map(int, rowEnds[x][1])), (0, 0, 255), thickness)
+        if grading[x] != 1 and 0 <= ans[x] < len(centers[x]):
+            correctAns = ans[x]
+            cv2.circle(img, tuple(map(int, centers[x][correctAns])), max(int(radii[x][correctAns]) // 2, 1),
+                       (0, 255, 0), cv2.FILLED)
+    return img
@@ -0,0 +1,119 @@
+# omr/voting.py
+"""
+Temporal voting for the live scanner: the answer of each row is the one most
+of the last frames of the same sheet agree on, and the sheet is ready to be
+captured once every row has given the same decision for stable_frames frames
+in a row. One noisy frame then can't be what gets recorded.
+"""
+from collections import deque
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+
+@dataclass
+class Vote:
+    """
+    State of the vote after a frame. result is the newest ScanResult with the
+    voted answers and the median fill matrix of the window (graded when the
+    voter was given the answer key); agreement is the share of frames behind
+    each voted answer, stable the run length of each row's current decision.
+    """
+    result: object
+    agreement: np.ndarray
+    stable: np.ndarray
+    frames: int
+    ready: bool
+
+    def stable_rows(self, stable_frames):
+        return int((self.stable >= stable_frames).sum())
+
+
+class FrameVoter:
+    """
+    Feed it every ScanResult of the live stream with add(). The window starts
+    over when the sheet is gone for max_gap frames, when its corners jump by
+    more than max_motion pixels (a different sheet, or one being moved) or when
+    the fill matrix changes shape. After hold() (the sheet in view has been
+    recorded) no vote is ready until that sheet is gone for max_gap frames or
+    the corners move by more than max_motion, so it isn't recorded twice.
+    """
+
+    def __init__(self, window=7, stable_frames=5, min_agreement=0.6, max_gap=3, max_motion=25.0):
+        self.window = window
+        self.stable_frames = stable_frames
+        self.min_agreement = min_agreement
+        self.max_gap = max_gap
+        self.max_motion = max_motion
+        self.frames = deque(maxlen=window)
+        self.held = None  # last frame of the recorded sheet while on hold
+        self.reset()
+
+    def reset(self):
+        self.frames.clear()
+        self.run = None
+        self.prev = None
+        self.gap = 0
+
+    def hold(self):
+        """Start over for the next sheet while the recorded one may still be in view."""
+        self.held = self.frames[-1] if self.frames else None
+        self.reset()
+
+    def add(self, result, answer_key=None):
+        """Add one frame's ScanResult; returns the Vote (None while no sheet has been seen)."""
+        if not result.found or result.fill is None:
+            self.gap += 1
+            if self.gap >= self.max_gap:
+                self.held = None
+                self.reset()
+            return self.vote(answer_key)
+        self.gap = 0
+        if self.held is not None and (self.held.fill.shape != result.fill.shape
+                                      or self._motion(self.held, result) > self.max_motion):
+            self.held = None  # another sheet, or the same one moved: vote from this frame on
+            self.reset()
+
+        if self.frames:
+            last = self.frames[-1]
+            if last.fill.shape != result.fill.shape or self._motion(last, result) > self.max_motion:
+                self.reset()
+
+        decisions = np.asarray(result.answers)
+        if self.prev is None:
+            self.run = np.ones(len(decisions), np.int32)
+        else:
+            self.run = np.where(decisions == self.prev, self.run + 1, 1)
+        self.prev = decisions
+        self.frames.append(result)
+        return self.vote(answer_key)
+
+    @staticmethod
+    def _motion(a, b):
+        if a.corners is None or b.corners is None or a.corners.shape != b.corners.shape:
+            return 0.0
+        return float(np.abs(np.float32(a.corners) - np.float32(b.corners)).max())
+
+    def vote(self, answer_key=None):
+        if not self.frames:
+            return None
+        latest = self.frames[-1]
+        decisions = np.array([r.answers for r in self.frames])  # (N, Q), -2 blank / -1 multi / choice
+        categories = np.arange(-2, latest.fill.shape[-1])
+        counts = (decisions[..., None] == categories).sum(axis=0)  # (Q, C + 2)
+        answers = categories[counts.argmax(axis=-1)]
+        agreement = counts.max(axis=-1) / len(self.frames)
+
+        fill = np.median(np.stack([r.fill for r in self.frames]), axis=0)
+        top2 = np.sort(fill, axis=-1)[:, -2:]
+        result = replace(latest, answers=answers.tolist(),
+                         fill=np.rint(fill).astype(latest.fill.dtype),
+                         confidence=(top2[:, 1] - top2[:, 0]) / np.maximum(top2[:, 1], 1))
+        if answer_key is not None:
+            result.grade(answer_key)
+
+        ready = (self.held is None
+                 and len(self.frames) >= self.stable_frames
+                 and bool((self.run >= self.stable_frames).all())
+                 and bool((agreement >= self.min_agreement).all()))
+        return Vote(result, agreement, self.run.copy(), len(self.frames), ready)
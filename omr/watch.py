@@ -0,0 +1,215 @@
+# omr/watch.py
+"""
+Hot-folder mode: grade the images a network scanner drops into a folder.
+
+    python -m omr.watch incoming/ --fiducials --exam midterm
+    python -m omr.watch incoming/ -j 4 --once          # grade what is there, then exit
+
+A file is picked up once its size and mtime have not changed for --settle
+seconds (and a JPEG / PNG ends with its end marker), so half-written scans are
+left alone. At most --max-inflight files are being graded at a time; the rest
+wait in the folder. Every result is appended to the CSV (and the results
+store with --exam) as soon as it is back, and the image is moved to
+processed/ or failed/ next to it.
+"""
+import argparse
+import csv
+import os
+import time
+from multiprocessing import Pool
+
+from omr import utlis
+from omr.batch import IMAGE_EXTS, _init_service_worker, add_grading_args, grade_file, grading_layout_path
+from omr.grading import CohortGrader, item_report
+from omr.store import DB_PATH, open_store
+
+_END_MARKERS = {".jpg": b"\xff\xd9", ".jpeg": b"\xff\xd9", ".png": b"IEND\xaeB`\x82"}
+
+
+def _looks_complete(path):
+    # JPEG / PNG written to the end; other formats rely on the settle time alone
+    marker = _END_MARKERS.get(os.path.splitext(path)[1].lower())
+    if marker is None:
+        return True
+    try:
+        with open(path, "rb") as f:
+            f.seek(-64, os.SEEK_END)  # a few padding bytes may follow the marker
+            return marker in f.read()
+    except OSError:
+        return False
+
+
+class FolderWatcher:
+    """
+    Polls a folder (no subfolders) and returns each image once, after it stopped
+    changing. A file that stays unchanged for give_up seconds without looking
+    complete (empty, or truncated by a scanner that died) is returned anyway,
+    so it ends up in failed/ instead of sitting in the folder forever.
+    """
+
+    def __init__(self, folder, settle=1.0, give_up=30.0):
+        self.folder = folder
+        self.settle = settle
+        self.give_up = give_up
+        self._seen = {}  # path -> ((size, mtime), time that signature was first seen)
+        self._taken = set()
+
+    def poll(self):
+        now = time.monotonic()
+        ready = []
+        present = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTS):
+                    continue
+                path = entry.path
+                present.add(path)
+                if path in self._taken:
+                    continue
+                st = entry.stat()
+                signature = (st.st_size, st.st_mtime_ns)
+                seen = self._seen.get(path)
+                if seen is None or seen[0] != signature:
+                    self._seen[path] = (signature, now)
+                elif now - seen[1] >= self.settle and (st.st_size > 0 and _looks_complete(path)
+                                                       or now - seen[1] >= self.give_up):
+                    ready.append(path)
+        for path in list(self._seen):
+            if path not in present:
+                del self._seen[path]
+        self._taken &= present
+        ready.sort(key=lambda p: self._seen[p][1])  # oldest first
+        return ready
+
+    def take(self, path):
+        self._taken.add(path)
+        self._seen.pop(path, None)
+
+    def waiting(self):
+        """Images seen but not handed out yet."""
+        return len(self._seen)
+
+
+def move_to(path, folder):
+    """Move path into folder, adding -1, -2, ... to the name if it is taken. Returns the new path."""
+    os.makedirs(folder, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    dest = os.path.join(folder, stem + ext)
+    n = 0
+    while os.path.exists(dest):
+        n += 1
+        dest = os.path.join(folder, f"{stem}-{n}{ext}")
+    os.replace(path, dest)
+    return dest
+
+
+def watch(folder, answer_key, out_path="results/watch_results.csv", workers=None, layout_path=None,
+          full_res=False, fiducials=False, exam=None, db_path=DB_PATH, max_inflight=None,
+          settle=1.0, poll_interval=0.25, processed_dir=None, failed_dir=None, once=False, give_up=30.0,
+          cohort=None):
+    """
+    Grade images as they arrive in folder until interrupted (or, with once,
+    until the folder is empty). Graded sheets are also added to cohort (an
+    omr.grading.CohortGrader) if given. Returns (graded, failed) counts.
+    """
+    processed_dir = processed_dir or os.path.join(folder, "processed")
+    failed_dir = failed_dir or os.path.join(folder, "failed")
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or 2 * workers  # keep every worker busy, no deeper
+    total = len(answer_key)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    new_file = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+    out = open(out_path, "a", newline="", encoding="utf-8")
+    writer = csv.writer(out)
+    if new_file:
+        writer.writerow(["Student Name", "Answers", "Score", "Total"])
+        out.flush()
+    store = open_store(db_path) if exam is not None else None
+
+    watcher = FolderWatcher(folder, settle, give_up)
+    pending = {}
+    graded = failed = 0
+    start = time.perf_counter()
+    print(f"👀 Watching {folder} ({workers} workers, up to {max_inflight} in flight) - Ctrl+C to stop")
+    pool = Pool(workers, initializer=_init_service_worker, initargs=(answer_key, layout_path, False, full_res, fiducials))
+    try:
+        while True:
+            for path in watcher.poll()[:max_inflight - len(pending)]:
+                watcher.take(path)
+                pending[path] = pool.apply_async(grade_file, (path,))
+
+            done = [path for path, job in pending.items() if job.ready()]
+            for path in done:
+                job = pending.pop(path)
+                student_id = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    _, answers, score, result, _ = job.get()
+                except Exception as e:
+                    answers, score, result = {}, -1, None
+                    print(f"❌ {path}: {e}")
+                if score == -1:
+                    failed += 1
+                    move_to(path, failed_dir)
+                    print(f"⚠️ No OMR Sheet detected: {os.path.basename(path)} -> {failed_dir}")
+                    continue
+                writer.writerow([student_id, str(answers), score, total])
+                out.flush()
+                if store is not None:
+                    store.insert_result(student_id, answers, score, total, exam, result)
+                if cohort is not None:
+                    cohort.add_result(result)
+                move_to(path, processed_dir)
+                graded += 1
+                elapsed = time.perf_counter() - start
+                print(f"✅ {student_id}: {score}/{total} ({graded + failed} sheets, "
+                      f"{(graded + failed) / elapsed:.1f} sheets/s, {len(pending)} in flight)")
+
+            if once and not pending and not watcher.waiting():
+                break
+            if not done:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print(f"⏹ Stopped, {len(pending)} sheets in flight stay in the folder for the next run.")
+    finally:
+        pool.terminate()
+        pool.join()
+        out.close()
+        if store is not None:
+            store.close()
+    print(f"Graded {graded} sheets, {failed} failed. Results in {out_path}")
+    return graded, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade scans as they appear in a folder.")
+    parser.add_argument("folder", help="folder the scanner writes to")
+    add_grading_args(parser)
+    parser.add_argument("-o", "--output", default="results/watch_results.csv", help="CSV the results are appended to")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--max-inflight", type=int, default=None,
+                        help="files being graded at once (default: twice the workers)")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="seconds a file must stay unchanged before it is read")
+    parser.add_argument("--processed", default=None, help="default: FOLDER/processed")
+    parser.add_argument("--failed", default=None, help="default: FOLDER/failed")
+    parser.add_argument("--once", action="store_true", help="exit when the folder has been emptied")
+    parser.add_argument("--items", nargs="?", const="", default=None, metavar="JSON",
+                        help="print the item analysis when stopped (and write it to JSON if given)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"not a folder: {args.folder}")
+    answer_key = utlis.load_answer_key(args.questions, args.layout)
+    cohort = CohortGrader.for_key(answer_key) if args.items is not None else None
+    watch(args.folder, answer_key, args.output, workers=args.workers,
+          layout_path=grading_layout_path(args), full_res=args.full_res,
+          fiducials=args.fiducials, exam=args.exam, db_path=args.db, max_inflight=args.max_inflight,
+          settle=args.settle, processed_dir=args.processed, failed_dir=args.failed, once=args.once,
+          cohort=cohort)
+    if cohort is not None:
+        item_report(cohort, args.items)
+
+
+if __name__ == "__main__":
+    main()
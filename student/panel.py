@@ -1,51 +1,67 @@
 # student/panel.py
-import csv
 import tkinter as tk
 from tkinter import messagebox, filedialog
 from tkinter import ttk, messagebox
-import json, os
-from omr.processor import realtime_scan, scan_image
-from omr.utlis import check_answers, export_result
-import pandas as pd
-
-os.makedirs("data", exist_ok=True)
+import json, os, queue
+from omr.bank import BANK_PATH, open_bank
+# cv2 / numpy (omr.processor, omr.live, omr.utlis, student.records) are imported
+# by the buttons that need them, so the panel opens without loading them
 
 class StudentPanel:
     def __init__(self, root,go_back_callback=None):
         self.root = root
         self.go_back_callback = go_back_callback
         self.root.title("OMR Check Panel")
-        self.root.geometry("720x480")
+        self.root.geometry("1000x620")
+        self.worker = None  # started by the first scan, see student/worker.py
+        self._preview_img = None
 
         tk.Label(root, text="OMR Check Panel", font=("Arial", 16)).pack(pady=8)
 
-        form = tk.Frame(root)
+        body = tk.Frame(root)
+        body.pack(fill=tk.BOTH, expand=True)
+        left = tk.Frame(body)
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=10)
+        self.preview_label = tk.Label(body, text="Camera preview", width=60, relief="sunken")
+        self.preview_label.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=6)
+
+        form = tk.Frame(left)
         form.pack(pady=6)
         tk.Label(form, text="Student  Name:").grid(row=0, column=0, sticky="e")
         self.student_id_var = tk.StringVar()
-        tk.Entry(form, textvariable=self.student_id_var, width=30).grid(row=0, column=1, padx=8)
-
-        tk.Button(root, text="Show  Questions", width=28, command=self.show_printed_questions).pack(pady=8)
-        tk.Button(root, text="Scan ", width=28, command=self.start_camera_scan).pack(pady=6)
+        name_entry = tk.Entry(form, textvariable=self.student_id_var, width=30)
+        name_entry.grid(row=0, column=1, padx=8)
+        name_entry.bind("<Return>", lambda event: self.start_camera_scan())
+
+        tk.Button(left, text="Show  Questions", width=28, command=self.show_printed_questions).pack(pady=6)
+        tk.Button(left, text="Scan (queue student)", width=28, command=self.start_camera_scan).pack(pady=4)
+        scan_row = tk.Frame(left)
+        scan_row.pack(pady=4)
+        tk.Button(scan_row, text="Capture", width=13, command=self.capture).grid(row=0, column=0, padx=2)
+        tk.Button(scan_row, text="Skip", width=13, command=self.skip).grid(row=0, column=1, padx=2)
         # tk.Button(root, text="Scan Image File", width=28, command=self.scan_image_file).pack(pady=6)\
-        tk.Button(root, text="Show Records", width=28, command=self.open_excel).pack(pady=6)
-        tk.Button(root, text="Back To Main Panel", width=28, command=self.back).pack(pady=6)
+        tk.Button(left, text="Grade Folder", width=28, command=self.grade_folder).pack(pady=4)
+        tk.Button(left, text="Show Records", width=28, command=self.open_excel).pack(pady=4)
+        tk.Button(left, text="Back To Main Panel", width=28, command=self.back).pack(pady=4)
 
-        self.result_label = tk.Label(root, text="", font=("Arial", 12), justify="left")
-        self.result_label.pack(pady=12)
+        self.status_label = tk.Label(left, text="", font=("Arial", 10), wraplength=300, justify="left")
+        self.status_label.pack(pady=4)
+        self.queue_label = tk.Label(left, text="", font=("Arial", 10), wraplength=300, justify="left")
+        self.queue_label.pack(pady=2)
+        self.result_label = tk.Label(left, text="", font=("Arial", 12), justify="left")
+        self.result_label.pack(pady=8)
 
     def _load_questions_and_layout(self):
-        if not os.path.exists("data/questions.json") or not os.path.exists("data/layout.json"):
-            messagebox.showerror("Error", "Missing questions.json or layout.json. Teacher must generate the sheet first.")
+        if not os.path.exists("data/layout.json") or not (os.path.exists(BANK_PATH) or os.path.exists("data/questions.json")):
+            messagebox.showerror("Error", "Missing question bank or layout.json. Teacher must generate the sheet first.")
             return None, None
-        with open("data/questions.json", "r", encoding="utf-8") as f:
-            questions = json.load(f)
         with open("data/layout.json", "r", encoding="utf-8") as f:
             layout = json.load(f)
         # Build printed order mapping from layout: printed_index -> original_q_no
         printed_map = {entry["printed_index"]: entry["original_q_no"] for entry in layout}
-        # Build a printed-ordered list of questions (use original q_no to find question)
-        q_by_no = {q["q_no"]: q for q in questions}
+        # Only the printed questions are read from the bank, by q_no
+        with open_bank() as bank:
+            q_by_no = bank.get_many(printed_map.values())
         printed_questions = []
         for printed_idx in sorted(printed_map.keys()):
             orig = printed_map[printed_idx]
@@ -86,33 +102,94 @@ class StudentPanel:
         text_widget.insert("1.0", txt)
         text_widget.config(state="disabled")  # make it read-only
 
+    def _answer_key(self):
+        printed_questions, _ = self._load_questions_and_layout()
+        if printed_questions is None:
+            return None
+        # original_q_no -> correct choice index, in printed order
+        letter_to_index = {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
+        return {q["q_no"]: letter_to_index.get(q["answer"], -1) for q in printed_questions}
+
+    def _ensure_worker(self):
+        if self.worker is None:
+            from student.worker import ScanWorker  # cv2 only once scanning starts
+            self.worker = ScanWorker()
+            self.root.after(50, self._poll_worker)
+        return self.worker
+
     def start_camera_scan(self):
+        # queued: the panel stays usable and the next name can be entered right away
         student_id = self.student_id_var.get().strip() or "Unknown"
-        printed_questions, printed_map = self._load_questions_and_layout()
-        if printed_questions is None:
+        answer_key = self._answer_key()
+        if answer_key is None:
             return
+        print("answer keys ", answer_key)
+        self._ensure_worker().scan_student(student_id, answer_key)
+        self.student_id_var.set("")
 
-        # Build answer_key mapping original_q_no -> correct answer from questions.json
-        # Letter → Number mapping
-        letter_to_index = {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
-        answer_key = {}
+    def capture(self):
+        if self.worker is not None:
+            self.worker.capture()
 
-        for q in printed_questions:
-            mapped_value = letter_to_index.get(q["answer"], -1)
-            answer_key[q["q_no"]] = mapped_value
-            print("answer keys " , answer_key)
-        try:
-            answers, score = realtime_scan(student_id, answer_key)
-        except Exception as e:
-            messagebox.showerror("Camera Error", str(e))
-            return
-        total = len(answer_key)
-        if score != -1 :
-            export_result(student_id, answers, score, total)
-        else :
-            score = 0
+    def skip(self):
+        if self.worker is not None:
+            self.worker.skip()
 
+    def grade_folder(self):
+        folder = filedialog.askdirectory(title="Folder of scanned sheets")
+        if not folder:
+            return
+        answer_key = self._answer_key()
+        if answer_key is None:
+            return
+        from omr.batch import collect_images
+        paths = collect_images(folder)
+        if not paths:
+            messagebox.showinfo("Grade Folder", "No images found in that folder.")
+            return
+        # printed sheets are read through their layout (data/layout.json), like the camera scans
+        self._ensure_worker().grade_files(paths, answer_key)
 
+    def _poll_worker(self):
+        """Drain the worker's events on the Tk thread; reschedules itself while the panel is open."""
+        if self.worker is None:
+            return
+        while True:
+            try:
+                event = self.worker.events.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_event(*event)
+        try:
+            frame = self.worker.preview.get(timeout=0)
+        except queue.Empty:
+            frame = None
+        if frame is not None:
+            self._preview_img = tk.PhotoImage(data=frame, format="png")  # keep a reference or Tk drops it
+            self.preview_label.config(image=self._preview_img, text="")
+        self.root.after(50, self._poll_worker)
+
+    def _handle_event(self, kind, *args):
+        if kind == "status":
+            self.status_label.config(text=args[0])
+        elif kind == "queue":
+            self.queue_label.config(text=f"Waiting: {', '.join(args[0])}" if args[0] else "")
+        elif kind == "result":
+            student_id, answers, score, total, answer_key = args
+            self.show_result(student_id, answers, score, total, answer_key)
+            self.status_label.config(text=f"✅ Saved {student_id}")
+        elif kind == "skipped":
+            self.status_label.config(text=f"Skipped {args[0]}")
+        elif kind == "progress":
+            done, total, rate = args
+            self.status_label.config(text=f"⚙️ {done}/{total} sheets, {rate:.1f} sheets/s")
+        elif kind == "batch_done":
+            out_path, sheets, seconds = args
+            self.status_label.config(text=f"✅ Graded {sheets} sheets in {seconds:.1f}s, results in {out_path}")
+        elif kind == "error":
+            self.status_label.config(text=args[0])
+
+    def show_result(self, student_id, answers, score, total, answer_key):
         # Number → Letter mapping for display
         index_to_letter = {0: "A", 1: "B", 2: "C", 3: "D", 4: "E"}
 
@@ -130,113 +207,38 @@ class StudentPanel:
         if not file_path:
             return
         student_id = self.student_id_var.get().strip() or "Unknown"
-        answers, _ = scan_image(file_path)
-        # we need answer_key to compute score
         printed_questions, _ = self._load_questions_and_layout()
         if printed_questions is None:
             return
-        answer_key = {q["q_no"]: q["answer"] for q in printed_questions}
-        score, total, details = check_answers(answers, answer_key)
-        export_result(student_id, answers, score, total)
+        from omr.layout import load_layout
+        from omr.processor import scan_image
+        from omr.utlis import export_result, LETTER_TO_INDEX, INDEX_TO_LETTER
+        answer_key = {q["q_no"]: LETTER_TO_INDEX.get(q["answer"], -1) for q in printed_questions}
+        # the same printed layout the camera and folder scans read
+        answers, score, scan = scan_image(file_path, answer_key, layout=load_layout("data/layout.json"))
+        total = len(answer_key)
+        if score != -1:
+            export_result(student_id, answers, score, total, scan=scan)
+        else:
+            score = 0
         s = f"Student Name: {student_id}\nScore: {score}/{total}\n\n"
-        for q_no, det in details.items():
-            s += f"Q{q_no}: detected={det['student']} correct={det['correct']}\n"
+        for q_no, correct_idx in answer_key.items():
+            s += f"Q{q_no}: detected={answers.get(q_no, '-')} correct={INDEX_TO_LETTER.get(correct_idx, '-')}\n"
         self.result_label.config(text=s)
 
     def back(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
         self.root.destroy()
         if self.go_back_callback:
             self.go_back_callback()
 
-    def open_excel(self, file_path="results/results.csv"):
-        # Check if file exists
-        if not os.path.exists(file_path):
-            messagebox.showerror("Error", f"File not found: {file_path}")
-            return None
-
+    def open_excel(self, db_path=None):
+        from omr.store import DB_PATH
+        from student.records import RecordsWindow
         try:
-            df = pd.read_csv(file_path)
+            return RecordsWindow(self.root, db_path or DB_PATH)
         except Exception as e:
-            messagebox.showerror("Error", f"Error reading CSV file: {e}")
+            messagebox.showerror("Error", f"Error opening results: {e}")
             return None
-
-        # Create a new window
-        win = tk.Toplevel(self.root)
-        win.title("Student's Answers Records")
-        win.geometry("800x500")
-
-        # Treeview widget
-        tree = tk.ttk.Treeview(win, columns=list(df.columns), show="headings")
-        tree.pack(fill="both", expand=True)
-
-        # Define headings
-        for col in df.columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=150)
-
-        # Function to load/reload data
-        def load_data():
-            try:
-                df_new = pd.read_csv(file_path)
-
-                # Clear old rows
-                for item in tree.get_children():
-                    tree.delete(item)
-
-                # Insert updated rows
-                for _, row in df_new.iterrows():
-                    tree.insert("", "end", values=list(row))
-            except Exception as e:
-                messagebox.showerror("Error", f"Error refreshing data: {e}")
-
-        # Initial load
-        load_data()
-
-        # Clear records function
-        def clear_records():
-            if messagebox.askyesno("Confirm", "Are you sure you want to clear all records?"):
-                try:
-                    header = list(df.columns)
-                    with open(file_path, "w", newline="", encoding="utf-8") as f:
-                        writer = csv.writer(f)
-                        writer.writerow(header)
-
-                    load_data()
-                    messagebox.showinfo("Cleared", "All records cleared (header preserved).")
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to clear records: {e}")
-
-        # Delete selected row(s) function
-        def delete_selected():
-            selected_items = tree.selection()
-            if not selected_items:
-                messagebox.showwarning("Warning", "No row selected.")
-                return
-
-            if not messagebox.askyesno("Confirm", "Delete selected record(s)?"):
-                return
-
-            try:
-                # Remove from tree
-                for item in selected_items:
-                    tree.delete(item)
-
-                # Save back to CSV (keep header + remaining rows)
-                rows = [tree.item(child)["values"] for child in tree.get_children()]
-                with open(file_path, "w", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(df.columns)  # header
-                    writer.writerows(rows)
-
-                messagebox.showinfo("Deleted", "Selected record(s) deleted successfully.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete record(s): {e}")
-
-        # Buttons
-        btn_frame = tk.Frame(win)
-        btn_frame.pack(pady=10)
-
-        tk.Button(btn_frame, text="Refresh", command=load_data).pack(side="left", padx=5)
-        tk.Button(btn_frame, text="Clear All Records", command=clear_records).pack(side="left", padx=5)
-        tk.Button(btn_frame, text="Delete Selected", command=delete_selected).pack(side="left", padx=5)
-
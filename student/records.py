@@ -0,0 +1,171 @@
+# student/records.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from omr.store import DB_PATH, open_store
+
+PAGE_SIZE = 200
+
+# Treeview column -> sortable store column
+SORT_KEYS = {"Student Name": "student", "Score": "score"}
+
+
+class RecordsWindow:
+    """
+    "Show Records" window over the results store. Rows are fetched one page at
+    a time as the list is scrolled; sorting and filtering are done by SQLite,
+    and Refresh only fetches results added since the last load.
+    """
+
+    columns = ["Student Name", "Answers", "Score", "Total"]
+
+    def __init__(self, root, db_path=DB_PATH):
+        self.store = open_store(db_path)
+        self.order_by = "id"
+        self.descending = False
+        self.filters = {}
+        self.loaded = 0
+        self.last_id = 0
+        self.exhausted = False
+
+        self.win = tk.Toplevel(root)
+        self.win.title("Student's Answers Records")
+        self.win.geometry("800x500")
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Filters
+        filter_frame = tk.Frame(self.win)
+        filter_frame.pack(fill="x", pady=4)
+        tk.Label(filter_frame, text="Name:").pack(side="left", padx=(8, 2))
+        self.name_var = tk.StringVar()
+        name_entry = tk.Entry(filter_frame, textvariable=self.name_var, width=20)
+        name_entry.pack(side="left")
+        name_entry.bind("<Return>", lambda event: self.apply_filter())
+        tk.Label(filter_frame, text="Min score:").pack(side="left", padx=(8, 2))
+        self.min_score_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.min_score_var, width=6).pack(side="left")
+        tk.Button(filter_frame, text="Filter", command=self.apply_filter).pack(side="left", padx=6)
+        self.count_label = tk.Label(filter_frame, text="")
+        self.count_label.pack(side="right", padx=8)
+
+        # Treeview widget, item ids are the result ids in the store
+        table = tk.Frame(self.win)
+        table.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(table, columns=self.columns, show="headings")
+        self.scroll = tk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scroll.pack(side="right", fill="y")
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=150)
+
+        # Buttons
+        btn_frame = tk.Frame(self.win)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Refresh", command=self.refresh).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Clear All Records", command=self.clear_records).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Delete Selected", command=self.delete_selected).pack(side="left", padx=5)
+
+        self.reload()
+
+    # ---- loading ----
+    def reload(self):
+        self.tree.delete(*self.tree.get_children())
+        self.loaded = 0
+        self.exhausted = False
+        self.last_id = self.store.max_id()
+        self.load_page()
+
+    def load_page(self):
+        if self.exhausted:
+            return
+        rows = self.store.query(order_by=self.order_by, descending=self.descending,
+                                limit=PAGE_SIZE, offset=self.loaded, **self.filters)
+        self.insert_rows(rows)
+        self.loaded += len(rows)
+        self.exhausted = len(rows) < PAGE_SIZE
+        self.update_count()
+
+    def insert_rows(self, rows):
+        answers = self.store.answers_for([r[0] for r in rows])
+        for rid, student, _, score, total, _ in rows:
+            text = " ".join(f"{q}:{a}" for q, a in answers[rid].items())
+            self.tree.insert("", "end", iid=str(rid), values=[student, text, score, total])
+
+    def on_scroll(self, first, last):
+        self.scroll.set(first, last)
+        if float(last) > 0.9:
+            self.load_page()
+
+    def refresh(self):
+        try:
+            if self.order_by == "id" and not self.descending:
+                # new results sort last: fetch only those, and only once the end is showing
+                if self.exhausted:
+                    rows = self.store.query(after_id=self.last_id, **self.filters)
+                    self.insert_rows(rows)
+                    self.loaded += len(rows)
+                self.last_id = self.store.max_id()
+                self.update_count()
+            else:
+                self.reload()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error refreshing data: {e}")
+
+    def update_count(self):
+        self.count_label.config(text=f"{self.loaded} of {self.store.count(**self.filters)} records")
+
+    # ---- sorting / filtering ----
+    def sort_by(self, col):
+        key = SORT_KEYS.get(col)
+        if key is None:
+            return
+        self.descending = not self.descending if self.order_by == key else False
+        self.order_by = key
+        self.reload()
+
+    def apply_filter(self):
+        filters = {}
+        if self.name_var.get().strip():
+            filters["name_like"] = self.name_var.get().strip()
+        if self.min_score_var.get().strip():
+            try:
+                filters["min_score"] = float(self.min_score_var.get())
+            except ValueError:
+                messagebox.showerror("Error", "Min score must be a number.")
+                return
+        self.filters = filters
+        self.reload()
+
+    # ---- editing ----
+    def clear_records(self):
+        if messagebox.askyesno("Confirm", "Are you sure you want to clear all records?"):
+            try:
+                self.store.clear()
+                self.reload()
+                messagebox.showinfo("Cleared", "All records cleared.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to clear records: {e}")
+
+    def delete_selected(self):
+        selected_items = self.tree.selection()
+        if not selected_items:
+            messagebox.showwarning("Warning", "No row selected.")
+            return
+
+        if not messagebox.askyesno("Confirm", "Delete selected record(s)?"):
+            return
+
+        try:
+            self.store.delete(selected_items)
+            self.tree.delete(*selected_items)
+            self.loaded -= len(selected_items)
+            self.update_count()
+            messagebox.showinfo("Deleted", "Selected record(s) deleted successfully.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to delete record(s): {e}")
+
+    def close(self):
+        self.store.close()
+        self.win.destroy()
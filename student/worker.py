@@ -0,0 +1,213 @@
+# student/worker.py
+"""
+Background scanning for the StudentPanel.
+
+One worker thread runs the jobs in the order they were queued: camera scans
+(one student each) and folder batches. It never touches Tk; everything it
+has to say goes into `events`, a thread-safe queue the panel drains with
+root.after(). The camera stays open while more camera jobs are waiting, so
+the operator can type the next name and queue it during the current scan.
+
+Events are tuples:
+    ("status", text)
+    ("queue", [waiting job labels])
+    ("result", student, answers, score, total, answer_key)
+    ("progress", done, total, sheets_per_second)
+    ("batch_done", out_path, sheets, seconds)
+    ("skipped", student)
+    ("error", text)
+"""
+import base64
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+import cv2
+
+from omr import utlis
+from omr.batch import run_batch
+from omr.layout import load_layout
+from omr.live import LatestQueue, LiveScanner
+from omr.voting import FrameVoter
+from omr.store import DEFAULT_EXAM
+
+PREVIEW_WIDTH = 480
+LAYOUT_PATH = "data/layout.json"
+
+
+@dataclass
+class ScanJob:
+    kind: str  # "camera" or "files"
+    student: str = ""
+    answer_key: dict = field(default_factory=dict)
+    paths: list = field(default_factory=list)
+    out_path: str = "results/batch_results.csv"
+    layout_path: str = None
+
+    def label(self):
+        return self.student if self.kind == "camera" else f"{len(self.paths)} files"
+
+
+class ScanWorker:
+    def __init__(self, camera=1, layout=None, exam=DEFAULT_EXAM, auto_capture=True, layout_path=LAYOUT_PATH):
+        self.camera = camera
+        self.auto_capture = auto_capture  # save as soon as the voted answers are stable
+        self.layout = layout  # a compiled BubbleLayout; None reads layout_path for every job
+        self.layout_path = layout_path
+        self.exam = exam
+        self.events = queue.Queue()
+        self.preview = LatestQueue(1)  # newest PNG (base64) of the overlay, for a tk.PhotoImage
+        self.jobs = queue.Queue()
+        self.waiting = []
+        self._lock = threading.Lock()
+        self._capture = threading.Event()
+        self._skip = threading.Event()
+        self._stop = threading.Event()
+        self.scanner = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # ---- called from the Tk thread ----
+    def submit(self, job):
+        with self._lock:
+            self.waiting.append(job.label())
+            self.events.put(("queue", list(self.waiting)))
+        self.jobs.put(job)
+
+    def scan_student(self, student, answer_key):
+        self.submit(ScanJob("camera", student, answer_key))
+
+    def grade_files(self, paths, answer_key, out_path="results/batch_results.csv", layout_path=None):
+        # layout_path None: the same printed layout the camera scans use
+        self.submit(ScanJob("files", answer_key=answer_key, paths=list(paths), out_path=out_path,
+                            layout_path=layout_path))
+
+    def capture(self):
+        self._capture.set()
+
+    def skip(self):
+        self._skip.set()
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join(timeout=2)
+
+    # ---- worker thread ----
+    def _post(self, *event):
+        self.events.put(event)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.jobs.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self.waiting.remove(job.label())
+                self._post("queue", list(self.waiting))
+            try:
+                if job.kind == "camera":
+                    self._camera_job(job)
+                else:
+                    self._files_job(job)
+            except Exception as e:
+                self._post("error", f"{job.label()}: {e}")
+            if self.jobs.empty():
+                self._close_camera()  # nobody waiting, give the camera back
+        self._close_camera()
+
+    def _layout_path(self):
+        return self.layout_path if self.layout_path and os.path.exists(self.layout_path) else None
+
+    def _current_layout(self):
+        # camera and folder jobs read the printed sheet the same way; load_layout recompiles only on change
+        if self.layout is not None:
+            return self.layout
+        path = self._layout_path()
+        return load_layout(path) if path else None
+
+    def _open_camera(self, answer_key):
+        if self.scanner is None:
+            self.scanner = LiveScanner(answer_key, self._current_layout(), self.camera, voter=FrameVoter())
+            if not self.scanner.start():
+                self.scanner = None
+                return None
+        else:
+            self.scanner.reset(answer_key)  # new student, new sheet
+        return self.scanner
+
+    def _close_camera(self):
+        if self.scanner is not None:
+            self.scanner.stop()
+            print(self.scanner.report())
+            self.scanner = None
+
+    def _camera_job(self, job):
+        # a camera still open from the last student waits for that sheet to leave (FrameVoter.hold)
+        next_sheet = self.scanner is not None
+        scanner = self._open_camera(job.answer_key)
+        if scanner is None:
+            self._post("error", "❌ Cannot access camera!")
+            return
+        self._capture.clear()
+        self._skip.clear()
+        self._post("status", f"📷 Scanning {job.student} - "
+                             + ("swap in the next sheet and hold it still" if next_sheet else "hold the sheet still")
+                             + (" (captured automatically)" if self.auto_capture else ", then press Capture"))
+        stable_frames = scanner.voter.stable_frames
+
+        last = None
+        while True:
+            if self._stop.is_set():
+                return
+            if self._skip.is_set():
+                self._post("skipped", job.student)
+                return
+            if not scanner.running():
+                self._close_camera()
+                self._post("error", "❌ Camera stopped")
+                return
+            got = scanner.latest()
+            if got is not None:
+                _, frame, result, vote = got
+                if vote is not None:
+                    last = vote
+                    cv2.putText(frame, f"stable {vote.stable_rows(stable_frames)}/{len(vote.stable)}",
+                                (10, frame.shape[0] - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+                self.preview.put(_encode_preview(frame))
+                if self.auto_capture and vote is not None and vote.ready:
+                    break
+            if self._capture.is_set():
+                self._capture.clear()
+                if last is not None:
+                    break
+                self._post("status", "⚠️ No sheet detected, hold the sheet in view and capture again")
+
+        scan = last.result  # voted answers, median fill of the window
+        answers = scan.letters()
+        total = len(job.answer_key)
+        score = (scan.score / 100) * total
+        utlis.export_result(job.student, answers, score, total, self.exam, scan=scan)
+        self._post("result", job.student, answers, score, total, job.answer_key)
+
+    def _files_job(self, job):
+        self._close_camera()  # batch workers get the CPU to themselves
+        self._post("status", f"⚙️ Grading {len(job.paths)} files...")
+
+        def progress(done, total, elapsed):
+            self._post("progress", done, total, done / elapsed if elapsed > 0 else 0.0)
+
+        start = time.perf_counter()
+        # spawned, not forked: this is a thread of the Tk process
+        run_batch(job.paths, job.answer_key, job.out_path, layout_path=job.layout_path or self._layout_path(),
+                  exam=self.exam, progress=progress, start_method="spawn")
+        self._post("batch_done", job.out_path, len(job.paths), time.perf_counter() - start)
+
+
+def _encode_preview(frame):
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (PREVIEW_WIDTH, int(h * PREVIEW_WIDTH / w)), interpolation=cv2.INTER_AREA)
+    ok, png = cv2.imencode(".png", small, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return base64.b64encode(png.tobytes()).decode("ascii") if ok else None
@@ -1,11 +1,11 @@
 # teacher/generate_sheet.py
 from PIL import Image, ImageDraw, ImageFont
-import json, random, os
+import json, os
+from omr.bank import BANK_PATH, load_questions
+from omr.layout import FIDUCIAL_SIZE, fiducial_centers
 
-os.makedirs("assets", exist_ok=True)
-os.makedirs("data", exist_ok=True)
-
-def generate_omr_sheet(output_file="assets/omr_sheet.png", num_columns=1):
+def generate_omr_sheet(output_file="assets/omr_sheet.png", num_columns=1, questions_file=None,
+                       layout_file="data/layout.json", printed_order_file="data/printed_order.json"):
     """
     Generate a printable OMR sheet (PNG). Also creates data/layout.json:
     layout.json has structure:
@@ -14,15 +14,18 @@ def generate_omr_sheet(output_file="assets/omr_sheet.png", num_columns=1):
       ...
     ]
     Coordinates are pixel rectangles (x, y, w, h) for each bubble.
+    questions_file is a questions.json, or None for the question bank.
     """
     # load saved questions
-    with open("data/questions.json", "r", encoding="utf-8") as f:
-        questions = json.load(f)
+    questions = load_questions(questions_file)
 
     # if too many questions, use first 10 or whatever length
     n = len(questions)
     if n == 0:
-        raise ValueError("No questions found in data/questions.json")
+        raise ValueError(f"No questions found in {questions_file or BANK_PATH}")
+
+    for path in (output_file, layout_file, printed_order_file):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
 
     # We'll layout for up to 20 questions comfortably on the page; adapt to n
     width, height = 800, 1100
@@ -33,7 +36,12 @@ def generate_omr_sheet(output_file="assets/omr_sheet.png", num_columns=1):
     except:
         font = ImageFont.load_default()
 
-    draw.text((40, 30), "Student ID: ____________________", fill="black", font=font)
+    # solid corner squares for the marker-based locator (omr/fiducials.py)
+    for cx, cy in fiducial_centers((width, height)):
+        x1, y1 = int(cx - FIDUCIAL_SIZE / 2), int(cy - FIDUCIAL_SIZE / 2)
+        draw.rectangle((x1, y1, x1 + FIDUCIAL_SIZE - 1, y1 + FIDUCIAL_SIZE - 1), fill="black")
+
+    draw.text((60, 30), "Student ID: ____________________", fill="black", font=font)
 
     start_y = 80
     line_height = 80
@@ -82,13 +90,14 @@ def generate_omr_sheet(output_file="assets/omr_sheet.png", num_columns=1):
     img.save(output_file)
 
     # Save layout mapping
-    with open("data/layout.json", "w", encoding="utf-8") as f:
+    with open(layout_file, "w", encoding="utf-8") as f:
         json.dump(layout, f, indent=2)
 
     # Also save a copy of the printed order mapping (printed_index -> original q no)
-    with open("data/printed_order.json", "w", encoding="utf-8") as f:
+    with open(printed_order_file, "w", encoding="utf-8") as f:
         printed_map = {entry["printed_index"]: entry["original_q_no"] for entry in layout}
         json.dump(printed_map, f, indent=2)
 
     print("OMR sheet generated:", output_file)
-    print("Layout mapping saved to data/layout.json")
+    print("Layout mapping saved to", layout_file)
+    return layout
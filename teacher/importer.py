@@ -0,0 +1,118 @@
+# teacher/importer.py
+"""
+Streaming Excel import of a question bank. Rows are read with openpyxl in
+read-only mode and checked a chunk at a time with column-wise string ops, so
+a 20,000-question workbook is never loaded whole and never walked with iterrows.
+"""
+import os
+
+import pandas as pd
+
+CHOICES = ["A", "B", "C", "D", "E"]
+REQUIRED_COLS = ["Question"] + CHOICES + ["Answer"]
+CHUNK_ROWS = 2000
+
+
+def _iter_xlsx(file_path, chunksize):
+    from openpyxl import load_workbook  # pandas' own xlsx engine
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header_row = 0
+        for header_row, header in enumerate(rows, start=1):
+            if any(v is not None for v in header):
+                break
+        else:
+            raise ValueError("The sheet is empty.")
+        names = [str(v).strip() if v is not None else "" for v in header]
+        missing = [c for c in REQUIRED_COLS if c not in names]
+        if missing:
+            raise ValueError(f"Excel must have columns: {', '.join(REQUIRED_COLS)} (missing {', '.join(missing)})")
+        pick = [names.index(c) for c in REQUIRED_COLS]
+
+        chunk = []
+        first = header_row + 1
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in pick])
+            if len(chunk) == chunksize:
+                yield first, chunk
+                first += len(chunk)
+                chunk = []
+        if chunk:
+            yield first, chunk
+    finally:
+        wb.close()
+
+
+def _iter_xls(file_path, chunksize):
+    # old .xls: openpyxl can't stream it, fall back to one read
+    df = pd.read_excel(file_path, dtype=object)
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Excel must have columns: {', '.join(REQUIRED_COLS)} (missing {', '.join(missing)})")
+    values = df[REQUIRED_COLS].to_numpy()
+    for start in range(0, len(values), chunksize):
+        yield start + 2, values[start:start + chunksize]
+
+
+def iter_chunks(file_path, chunksize=CHUNK_ROWS):
+    """(first sheet row number, rows in REQUIRED_COLS order) per chunk."""
+    if os.path.splitext(file_path)[1].lower() == ".xls":
+        return _iter_xls(file_path, chunksize)
+    return _iter_xlsx(file_path, chunksize)
+
+
+def validate_chunk(rows, first_row):
+    """
+    (valid DataFrame of stripped cells, {reason: [sheet row numbers]}) for one chunk.
+    Empty cells count as missing (not the string "nan"); fully blank rows are skipped.
+    """
+    df = pd.DataFrame(rows, columns=REQUIRED_COLS)
+    df = df.where(df.notna(), "").astype(str)
+    for col in REQUIRED_COLS:
+        df[col] = df[col].str.strip()
+    df["Answer"] = df["Answer"].str.upper()
+
+    row_no = pd.Series(range(first_row, first_row + len(df)), index=df.index)
+    blank = (df == "").all(axis=1)
+    no_text = (df["Question"] == "") & ~blank
+    no_choice = (df[CHOICES] == "").any(axis=1) & ~blank
+    bad_answer = ~df["Answer"].isin(CHOICES) & ~blank
+
+    errors = {}
+    for reason, mask in (("missing question text", no_text),
+                         ("missing option(s)", no_choice),
+                         ("answer not A-E", bad_answer)):
+        if mask.any():
+            errors[reason] = row_no[mask].tolist()
+    return df[~(blank | no_text | no_choice | bad_answer)], errors
+
+
+def import_excel(file_path, start_q_no=1, chunksize=CHUNK_ROWS):
+    """
+    Question dicts numbered from start_q_no, plus {reason: [rows]} for the rejected rows.
+    Raises ValueError for a missing column and whatever openpyxl raises for a bad file.
+    """
+    questions = []
+    errors = {}
+    q_no = start_q_no
+    for first_row, rows in iter_chunks(file_path, chunksize):
+        valid, chunk_errors = validate_chunk(rows, first_row)
+        for reason, row_nos in chunk_errors.items():
+            errors.setdefault(reason, []).extend(row_nos)
+        for text, a, b, c, d, e, answer in valid.itertuples(index=False, name=None):
+            questions.append({"q_no": q_no, "text": text,
+                              "choices": {"A": a, "B": b, "C": c, "D": d, "E": e}, "answer": answer})
+            q_no += 1
+    return questions, errors
+
+
+def format_errors(errors, max_rows=12):
+    """One line per reason with the first few sheet rows, for a messagebox."""
+    lines = []
+    for reason, row_nos in errors.items():
+        shown = ", ".join(str(r) for r in row_nos[:max_rows])
+        more = f" and {len(row_nos) - max_rows} more" if len(row_nos) > max_rows else ""
+        lines.append(f"{reason} ({len(row_nos)}): rows {shown}{more}")
+    return "\n".join(lines)
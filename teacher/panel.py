@@ -1,12 +1,10 @@
 # teacher/panel.py
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import json
 import os
-import pandas as pd  # for Excel reading
-from teacher.generate_sheet import generate_omr_sheet
+from omr.bank import QUESTIONS_JSON, open_bank
 
-os.makedirs("data", exist_ok=True)
+PREVIEW_LIMIT = 200  # questions rendered in the text box at once, the rest are only counted
 
 class TeacherPanel:
     def __init__(self, root, go_back_callback=None):
@@ -14,9 +12,9 @@ class TeacherPanel:
         self.go_back_callback = go_back_callback
         self.root.title("Create Questions Panel - Setup MCQs")
         self.root.geometry("850x600")
-        self.questions = []
-        self.q_no = 1
-        self.loaded_questions = []
+        self.bank = open_bank()
+        self.questions = []  # added but not saved yet
+        self.q_no = self.bank.next_q_no()
 
         tk.Label(
             root,
@@ -55,8 +53,10 @@ class TeacherPanel:
         tk.Button(btn_frame, text="Save Questions", width=18, command=self.save_questions).grid(row=0, column=1, padx=6)
         tk.Button(btn_frame, text="Load existing questions", width=20, command=self.load_questions).grid(row=0, column=2, padx=6)
         tk.Button(btn_frame, text="Upload from Excel", width=18, command=self.upload_excel).grid(row=0, column=3, padx=6)
-        tk.Button(btn_frame, text="Back To Main", width=18, command=self.back).grid(row=1, column=0, columnspan=6, pady=10)
         tk.Button(btn_frame, text="Delete All Questions", width=20, command=self.delete_all_questions).grid(row=0, column=4, padx=6)
+        tk.Button(btn_frame, text="Import questions.json", width=18, command=self.import_json).grid(row=1, column=1, padx=6, pady=6)
+        tk.Button(btn_frame, text="Export questions.json", width=20, command=self.export_json).grid(row=1, column=2, padx=6, pady=6)
+        tk.Button(btn_frame, text="Back To Main", width=18, command=self.back).grid(row=2, column=0, columnspan=6, pady=10)
 
         # Text widget for showing questions
         self.questions_frame = tk.Frame(root)
@@ -88,7 +88,7 @@ class TeacherPanel:
 
         self.clear_fields()
         self.q_entry.focus_set()
-        self.refresh_text(self.loaded_questions + self.questions)
+        self.append_text([item])
 
     def clear_fields(self):
         self.q_text_var.set("")
@@ -97,95 +97,117 @@ class TeacherPanel:
         self.correct_var.set("")
 
     def save_questions(self):
-        if not self.questions and not os.path.exists("data/questions.json"):
-            messagebox.showerror("Error", "No questions to save.")
+        if not self.questions:
+            messagebox.showerror("Error", "No new questions to save.")
             return
-        existing = []
-        if os.path.exists("data/questions.json"):
-            with open("data/questions.json", "r", encoding="utf-8") as f:
-                try:
-                    existing = json.load(f)
-                except:
-                    existing = []
-        combined = existing + self.questions
-        for idx, q in enumerate(combined, start=1):
-            q["q_no"] = idx
-        with open("data/questions.json", "w", encoding="utf-8") as f:
-            json.dump(combined, f, indent=2, ensure_ascii=False)
-
-        messagebox.showinfo("Saved", f"{len(combined)} questions saved.")
+        shown = [q["q_no"] for q in self.questions]
+        # one transaction for the new questions only, the saved bank is not read or rewritten
+        saved = self.bank.add_many(self.questions)
+        total = self.bank.count()
+
+        messagebox.showinfo("Saved", f"{len(saved)} questions saved ({total} in the bank).")
         self.questions = []
-        self.q_no = len(combined) + 1
-        self.loaded_questions = combined
-        self.refresh_text(combined)
+        self.q_no = self.bank.next_q_no()
+        if saved != shown:  # numbers taken in the meantime: show the stored ones
+            self.show_bank()
 
     def load_questions(self):
-        if not os.path.exists("data/questions.json"):
+        total = self.bank.count()
+        if not total:
             messagebox.showinfo("Info", "No saved questions found.")
             return
-
-        with open("data/questions.json", "r", encoding="utf-8") as f:
-            try:
-                loaded = json.load(f)
-            except:
-                messagebox.showerror("Error", "Invalid JSON file.")
-                return
-
-        self.loaded_questions = loaded
         self.questions = []
-        self.q_no = len(loaded) + 1
-        self.refresh_text(loaded)
-        messagebox.showinfo("Loaded", f"{len(loaded)} questions loaded.")
+        self.q_no = self.bank.next_q_no()
+        self.show_bank()
+        messagebox.showinfo("Loaded", f"{total} questions loaded.")
+
+    def show_bank(self):
+        """First PREVIEW_LIMIT saved questions, one page read from the bank."""
+        total = self.bank.count()
+        self.refresh_text(self.bank.questions(limit=PREVIEW_LIMIT))
+        if total > PREVIEW_LIMIT:
+            self.append_text([], extra=total - PREVIEW_LIMIT)
 
     def refresh_text(self, questions):
         self.text_widget.config(state=tk.NORMAL)
         self.text_widget.delete("1.0", tk.END)
+        self.text_widget.insert(tk.END, "".join(self._format_question(q) for q in questions))
+        self.text_widget.config(state=tk.DISABLED)
 
-        for q in questions:
-            q_text = f"Q{q.get('q_no')}: {q.get('text')}\n"
-            choices = "\n".join([f"   {c}. {q['choices'].get(c,'')}" for c in ["A","B","C","D","E"]])
-            ans = f"   ✅ Correct Answer: {q.get('answer')}\n"
-            self.text_widget.insert(tk.END, q_text + choices + "\n" + ans + "\n" + "-"*70 + "\n")
-
+    def append_text(self, questions, limit=PREVIEW_LIMIT, extra=0):
+        """Add new questions at the end without redrawing the ones already shown."""
+        text = "".join(self._format_question(q) for q in questions[:limit])
+        extra += max(len(questions) - limit, 0)
+        if extra:
+            text += f"... {extra} more questions (not shown)\n" + "-"*70 + "\n"
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.insert(tk.END, text)
         self.text_widget.config(state=tk.DISABLED)
+        self.text_widget.see(tk.END)
+
+    @staticmethod
+    def _format_question(q):
+        q_text = f"Q{q.get('q_no')}: {q.get('text')}\n"
+        choices = "\n".join([f"   {c}. {q['choices'].get(c,'')}" for c in ["A","B","C","D","E"]])
+        ans = f"   ✅ Correct Answer: {q.get('answer')}\n"
+        return q_text + choices + "\n" + ans + "\n" + "-"*70 + "\n"
 
     def upload_excel(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx *.xls")])
         if not file_path:
             return
+        from teacher.importer import import_excel, format_errors  # pandas / openpyxl only when importing
         try:
-            df = pd.read_excel(file_path)
+            added, errors = import_excel(file_path, start_q_no=self.q_no)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Error", f"Failed to read Excel file: {e}")
             return
 
-        required_cols = ["Question", "A", "B", "C", "D", "E", "Answer"]
-        if not all(col in df.columns for col in required_cols):
-            messagebox.showerror("Error", f"Excel must have columns: {', '.join(required_cols)}")
-            return
-
-        added_count = 0
-        for _, row in df.iterrows():
-            q_text = str(row["Question"]).strip()
-            choices = {c: str(row[c]).strip() for c in ["A", "B", "C", "D", "E"]}
-            correct = str(row["Answer"]).strip().upper()
-            if q_text and correct in ["A", "B", "C", "D", "E"] and all(choices.values()):
-                item = {"q_no": self.q_no, "text": q_text, "choices": choices, "answer": correct}
-                self.questions.append(item)
-                self.q_no += 1
-                added_count += 1
+        self.questions.extend(added)
+        self.q_no += len(added)
+        self.append_text(added)
 
-        self.refresh_text(self.loaded_questions + self.questions)
-        messagebox.showinfo("Excel Upload", f"{added_count} questions added.")
+        if errors:
+            skipped = len({r for rows in errors.values() for r in rows})
+            messagebox.showwarning("Excel Upload",
+                                   f"{len(added)} questions added, {skipped} rows skipped:\n\n{format_errors(errors)}")
+        else:
+            messagebox.showinfo("Excel Upload", f"{len(added)} questions added.")
 
     def generate_sheet(self):
-        if not os.path.exists("data/questions.json"):
+        if not self.bank.count():
             messagebox.showerror("Error", "No saved questions.")
             return
+        from teacher.generate_sheet import generate_omr_sheet  # PIL only when a sheet is drawn
         generate_omr_sheet()
         messagebox.showinfo("Generated", "OMR sheet saved.")
 
+    def import_json(self):
+        file_path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
+        if not file_path:
+            return
+        try:
+            count = self.bank.import_json(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import {file_path}: {e}")
+            return
+        self.q_no = max(self.q_no, self.bank.next_q_no())
+        self.show_bank()
+        messagebox.showinfo("Imported", f"{count} questions imported (same numbers are replaced).")
+
+    def export_json(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile=os.path.basename(QUESTIONS_JSON),
+                                                 filetypes=[("JSON Files", "*.json")])
+        if not file_path:
+            return
+        count = self.bank.export_json(file_path)
+        messagebox.showinfo("Exported", f"{count} questions written to {file_path}.")
+
     def back(self):
+        self.bank.close()
         self.root.destroy()
         if self.go_back_callback:
             self.go_back_callback()
@@ -196,18 +218,14 @@ class TeacherPanel:
         if not confirm:
             return
 
-        # Clear JSON file
-        if os.path.exists("data/questions.json"):
-            try:
-                with open("data/questions.json", "w", encoding="utf-8") as f:
-                    json.dump([], f, indent=2, ensure_ascii=False)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to clear file: {e}")
-                return
+        try:
+            self.bank.clear()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to clear the question bank: {e}")
+            return
 
         # Clear memory and UI
         self.questions = []
-        self.loaded_questions = []
         self.q_no = 1
         self.refresh_text([])
         messagebox.showinfo("Deleted", "All questions have been deleted.")
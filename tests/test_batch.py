@@ -0,0 +1,92 @@
+# tests/test_batch.py
+import argparse
+import csv
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from omr import batch
+from omr.cache import ScanCache
+from omr.processor import ScanResult
+
+
+@pytest.fixture
+def sheets(tmp_path, monkeypatch):
+    # three images; scan_sheet raises on the black one
+    paths = []
+    for name, value in (("a", 255), ("bad", 0), ("c", 255)):
+        path = str(tmp_path / f"{name}.png")
+        cv2.imwrite(path, np.full((400, 600), value, np.uint8))
+        paths.append(path)
+
+    def fake_scan_sheet(img, *args, **kwargs):
+        if img.mean() < 10:
+            raise cv2.error("src.cols >= win.width*2 + 5")
+        return ScanResult()
+
+    monkeypatch.setattr(batch, "scan_sheet", fake_scan_sheet)
+    return paths
+
+
+def test_grade_file_survives_a_raising_sheet(sheets):
+    batch._configure({1: 0})
+    path, answers, score, result, _ = batch.grade_file(sheets[1])
+    assert (path, answers, score, result) == (sheets[1], {}, -1, None)
+
+
+def test_batch_keeps_going_after_a_raising_sheet(sheets, tmp_path):
+    out = str(tmp_path / "out.csv")
+    batch.run_batch(sheets, {1: 0}, out, workers=1)
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert [row[0] for row in rows[1:]] == ["a", "bad", "c"]
+    assert all(row[2] == "-1" for row in rows[1:])
+
+
+def test_second_cached_run_with_an_undetectable_image(tmp_path):
+    # the blank page has no sheet; its cached ScanResult (answers [], q_nos set) is graded on the hit
+    path = str(tmp_path / "blank.png")
+    cv2.imwrite(path, np.full((400, 600), 255, np.uint8))
+    out = str(tmp_path / "out.csv")
+    for _ in range(2):
+        with ScanCache(str(tmp_path / "cache.db")) as cache:
+            batch.run_batch([path], {1: 0, 2: 1}, out, workers=1, cache=cache)
+    assert cache.hits == 1
+    with open(out, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f))[1:] == [["blank", "{}", "-1", "2"]]
+
+
+def test_grading_args(tmp_path):
+    parser = argparse.ArgumentParser()
+    batch.add_grading_args(parser)
+    layout = str(tmp_path / "layout.json")
+    args = parser.parse_args(["-l", layout, "--use-layout", "--fiducials", "--exam"])
+    assert (batch.grading_layout_path(args), args.fiducials, args.exam) == (layout, True, "default")
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--use-layout", "--legacy-grid"])
+
+
+def test_layout_is_the_default_when_it_exists(tmp_path):
+    parser = argparse.ArgumentParser()
+    batch.add_grading_args(parser)
+    layout = tmp_path / "layout.json"
+    assert batch.grading_layout_path(parser.parse_args(["-l", str(layout)])) is None  # no file: legacy grid
+    layout.write_text("[]")
+    assert batch.grading_layout_path(parser.parse_args(["-l", str(layout)])) == str(layout)
+    assert batch.grading_layout_path(parser.parse_args(["-l", str(layout), "--legacy-grid"])) is None
+
+
+def test_missing_parquet_writer_fails_before_grading(sheets, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)  # import pyarrow raises ImportError
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("graded before the writer was checked")
+
+    monkeypatch.setattr(batch, "scan_sheet", no_scan)
+    with pytest.raises(ImportError, match="pyarrow"):
+        batch.run_batch(sheets, {1: 0}, str(tmp_path / "out.parquet"), workers=1)
+    with pytest.raises(SystemExit):
+        batch.main([str(tmp_path), "-o", str(tmp_path / "out.parquet"), "-q", "missing.json", "--no-cache"])
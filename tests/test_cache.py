@@ -0,0 +1,103 @@
+# tests/test_cache.py
+import csv
+
+import cv2
+import numpy as np
+import pytest
+
+from bench.synthetic import build_template, distort, fill_sheet
+from omr import batch, cache as omr_cache
+from omr.cache import ScanCache, config_version, pack_result, unpack_result
+from omr.layout import load_layout
+from omr.processor import ScanResult, scan_sheet
+
+
+@pytest.fixture(scope="module")
+def scans(tmp_path_factory):
+    # one generated sheet photographed at mild lighting, and a page without a sheet
+    workdir = tmp_path_factory.mktemp("scans")
+    page, layout, answer_key = build_template(str(workdir), 5)
+    rng = np.random.default_rng(0)
+    sheet = str(workdir / "ana.jpg")
+    cv2.imwrite(sheet, distort(fill_sheet(page, layout, np.array([0, 1, 2, 3, 0]), rng), rng, light=0.2))
+    blank = str(workdir / "blank.png")
+    cv2.imwrite(blank, np.full((400, 600), 255, np.uint8))
+    return [sheet, blank], answer_key, str(workdir / "layout.json")
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_pack_round_trip(scans):
+    (sheet, blank), answer_key, layout_path = scans
+    layout = load_layout(layout_path)
+    for path in (sheet, blank):
+        result = scan_sheet(cv2.imread(path), answer_key, layout, fiducials=True)
+        back = unpack_result(pack_result(result))
+        assert (back.found, back.answers, back.q_nos) == (result.found, result.answers, result.q_nos)
+        assert (back.warp_size, back.frame_size, back.abs_threshold) == \
+               (result.warp_size, result.frame_size, result.abs_threshold)
+        for name in ("fill", "confidence", "homography", "corners"):
+            original = getattr(result, name)
+            assert (getattr(back, name) is None) if original is None else np.allclose(getattr(back, name), original)
+    assert unpack_result(pack_result(result)).found is False  # the blank page
+
+
+def test_second_run_is_served_from_the_cache(scans, tmp_path, monkeypatch):
+    paths, answer_key, layout_path = scans
+    first, second, db = str(tmp_path / "first.csv"), str(tmp_path / "second.csv"), str(tmp_path / "cache.db")
+    with ScanCache(db) as cache:
+        batch.run_batch(paths, answer_key, first, workers=1, layout_path=layout_path, fiducials=True, cache=cache)
+    assert _rows(first)[0][2] != "-1" and _rows(first)[1][2] == "-1"
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("a cached file was scanned again")
+
+    monkeypatch.setattr(batch, "scan_sheet", no_scan)
+    with ScanCache(db) as cache:
+        batch.run_batch(paths, answer_key, second, workers=1, layout_path=layout_path, fiducials=True, cache=cache)
+        assert (cache.hits, cache.misses) == (2, 0)
+    assert _rows(second) == _rows(first)
+
+    # hits are graded against the key of this run
+    flipped = {q: (a + 1) % 4 for q, a in answer_key.items()}
+    with ScanCache(db) as cache:
+        batch.run_batch(paths, flipped, second, workers=1, layout_path=layout_path, fiducials=True, cache=cache)
+    assert _rows(second)[0][1] == _rows(first)[0][1] and _rows(second)[0][2] != _rows(first)[0][2]
+
+
+def test_settings_change_the_key(scans, tmp_path, monkeypatch):
+    paths, answer_key, layout_path = scans
+    layout = load_layout(layout_path)
+    base = config_version(layout, 5)
+    assert len({base, config_version(layout, 5, full_res=True), config_version(layout, 5, fiducials=True),
+                config_version(None, 5), config_version(None, 6)}) == 5
+    assert config_version(None, 5, fiducials=True) == config_version(None, 5)  # no markers without a layout
+    monkeypatch.setattr(omr_cache, "PIPELINE_VERSION", omr_cache.PIPELINE_VERSION + 1)
+    assert config_version(layout, 5) != base
+
+    out, db = str(tmp_path / "out.csv"), str(tmp_path / "cache.db")
+    with ScanCache(db) as cache:
+        batch.run_batch(paths[:1], answer_key, out, workers=1, layout_path=layout_path, cache=cache)
+    with ScanCache(db) as cache:
+        batch.run_batch(paths[:1], answer_key, out, workers=1, layout_path=layout_path, full_res=True, cache=cache)
+        assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(omr_cache.time, "time", lambda: next(clock))
+    result = ScanResult(found=True, answers=[0, 1], q_nos=[1, 2], fill=np.zeros((2, 4), np.float32))
+    size = len(pack_result(result))
+    db = str(tmp_path / "cache.db")
+    with ScanCache(db, max_bytes=int(3.5 * size)) as cache:
+        for key in "abc":
+            cache.put(key, result)
+        assert cache.get("a") is not None  # a is now more recent than b
+        cache.put("d", result)
+        assert cache.size <= cache.max_bytes
+        assert [cache.get(key) is not None for key in "abcd"] == [True, False, True, True]
+    with ScanCache(db, max_bytes=int(3.5 * size)) as cache:
+        assert cache.size == 3 * size
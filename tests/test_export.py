@@ -0,0 +1,52 @@
+# tests/test_export.py
+import csv
+
+import numpy as np
+import pytest
+
+from omr import export
+from omr.store import ResultStore, read_results_csv
+
+
+def _write_csv(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Student Name", "Answers", "Score", "Total"])
+        writer.writerow(["ana", "{1: 'A', 2: 'C'}", "50.0", "2"])
+        writer.writerow(["ben", "not a dict", "", ""])
+
+
+def test_csv_parsed_once_for_store_and_export(tmp_path):
+    csv_path = tmp_path / "results.csv"
+    _write_csv(csv_path)
+    rows = read_results_csv(csv_path)
+    assert rows == [("ana", {1: "A", 2: "C"}, 50.0, 2), ("ben", {}, 0.0, 0)]
+
+    cols = export.columns_from_csv(csv_path)
+    assert cols["student"].tolist() == ["ana", "ben"]
+    assert cols["answers"].tolist() == [[0, 2], [-2, -2]]
+
+    store = ResultStore(str(tmp_path / "results.db"))
+    assert store.import_csv(csv_path) == 2
+    assert [(r[1], r[3], r[4]) for r in store.query()] == [("ana", 50.0, 2), ("ben", 0.0, 0)]
+    store.close()
+
+
+@pytest.mark.parametrize("name, fmt", [("cols.npz", None), ("cols", None), ("cols.npz", "npz"), ("cols", "npy")])
+def test_written_columns_load_back(tmp_path, name, fmt):
+    cols = export.columns_from_rows([("ana", {1: "A", 2: "C"}, 50.0, 2)])
+    path = str(tmp_path / name)
+    export.write_columns(path, cols, fmt)
+    loaded = export.load(path)
+    for key, values in cols.items():
+        assert np.array_equal(loaded[key], values)
+
+
+@pytest.mark.parametrize("name, fmt", [("cols.parquet", "npz"), ("cols", "npz"), ("cols.npz", "npy"), ("cols.npz", "parquet")])
+def test_format_that_load_cannot_read_back_is_rejected(tmp_path, name, fmt):
+    cols = export.columns_from_rows([("ana", {1: "A"}, 100.0, 1)])
+    with pytest.raises(ValueError):
+        export.write_columns(str(tmp_path / name), cols, fmt)
+    assert not (tmp_path / name).exists()
+    with pytest.raises(SystemExit):
+        export.main([str(tmp_path / name), "--from-csv", "x.csv", "--format", fmt])
@@ -0,0 +1,34 @@
+# tests/test_grading.py
+import numpy as np
+
+from omr.grading import CohortGrader, grade_matrix
+from omr.processor import ScanResult
+from omr.regrade import regrade
+
+# question 1 has no key (-1) and a multiple mark (-1), 2 is right, 3 is blank
+KEY = {1: -1, 2: 0, 3: 1}
+FILL = np.array([[900, 900, 0, 0], [900, 0, 0, 0], [0, 0, 0, 0]])
+
+
+def test_grade_matrix_never_credits_a_missing_key():
+    correct, scores = grade_matrix([[-1, 0, -2]], [-1, 0, 1])
+    assert correct.tolist() == [[False, True, False]]
+    assert scores.tolist() == [1]
+
+
+def test_scan_result_and_regrade_agree():
+    result = ScanResult(found=True, answers=[-1, 0, -2], q_nos=[1, 2, 3])
+    result.grade(KEY)
+    assert result.grading == [0, 1, 0]
+
+    (rid, _, score, total), = regrade([(7, 0.0, np.array([1, 2, 3]), FILL, 500)], KEY)
+    assert rid == 7
+    assert score == result.score / 100 * total
+
+
+def test_cohort_grader_takes_scan_results():
+    grader = CohortGrader.for_key(KEY)
+    result = ScanResult(found=True, answers=[0, -2], q_nos=[2, 3])  # question 1 not printed
+    correct, scores = grader.add_result(result)
+    assert correct.tolist() == [[False, True, False]]
+    assert grader.stats()["blank_rate"].tolist() == [1.0, 0.0, 1.0]
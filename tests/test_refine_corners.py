@@ -0,0 +1,37 @@
+# tests/test_refine_corners.py
+import numpy as np
+import pytest
+
+from omr.processor import refine_corners
+
+
+def _page(w, h, cx, cy):
+    # black sheet on a white desk, its bottom-right corner at (cx, cy)
+    img = np.full((h, w), 255, np.uint8)
+    img[:cy, :cx] = 0
+    return img
+
+
+@pytest.mark.parametrize("scale", [1.0, 1.33, 2.0, 4.0])
+@pytest.mark.parametrize("margin", range(0, 16))
+def test_corner_near_the_image_edge(scale, margin):
+    w, h = 800, 600
+    img = _page(w, h, w - margin, h - margin)
+    points = np.float32([[10, 10], [w - margin, 10], [10, h - margin], [w - margin, h - margin]])
+    refined = refine_corners(img, points, scale)
+    assert refined.shape == (4, 1, 2)
+    assert np.isfinite(refined).all()
+
+
+def test_corner_out_of_the_image_is_kept():
+    img = _page(800, 600, 790, 590)
+    points = np.float32([[10, 10], [805, 10], [10, 605], [805, 605]])
+    refined = refine_corners(img, points, 2.0)
+    np.testing.assert_array_equal(refined.reshape(-1, 2)[3], [805, 605])
+
+
+def test_corner_inside_is_refined():
+    img = _page(800, 600, 400, 300)
+    img[300:, :] = 255  # only the corner at (400, 300) is left
+    refined = refine_corners(img, np.float32([[402, 302]]), 2.0)
+    assert np.abs(refined.reshape(2) - (400, 300)).max() < 1.0
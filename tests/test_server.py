@@ -0,0 +1,69 @@
+# tests/test_server.py
+import base64
+import http.client
+import json
+import threading
+
+import pytest
+
+from omr.server import GradingServer, make_handler, parse_uploads
+
+
+class _Service:
+    max_queue = 8
+    timeout = 5.0
+
+    def grade(self, uploads, overlay=False):
+        return [{"found": True, "name": name} for name, _ in uploads]
+
+
+@pytest.fixture
+def server():
+    server = GradingServer(("127.0.0.1", 0), make_handler(_Service(), 2 ** 20, quiet=True))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def _post(address, path, body, headers):
+    conn = http.client.HTTPConnection(*address, timeout=5)
+    conn.putrequest("POST", path)
+    for name, value in headers.items():
+        conn.putheader(name, value)
+    conn.endheaders(body)
+    resp = conn.getresponse()
+    status, payload = resp.status, json.loads(resp.read())
+    conn.close()
+    return status, payload
+
+
+def test_json_images_parsed():
+    body = json.dumps({"images": [{"name": "ana", "data": base64.b64encode(b"jpg").decode()}], "overlay": 1})
+    assert parse_uploads(body.encode(), "application/json") == ([("ana", b"jpg")], {"overlay": 1})
+
+
+@pytest.mark.parametrize("payload", [[1, 2], {"images": "abc"}, {"images": ["abc"]}, {"images": [{"name": "x"}]},
+                                     {"images": [{"data": 5}]}, {"images": [{"name": [], "data": ""}]}])
+def test_malformed_json_images_raise_value_error(payload):
+    with pytest.raises(ValueError):
+        parse_uploads(json.dumps(payload).encode(), "application/json")
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+def test_bad_content_length_is_400(server, length):
+    status, payload = _post(server, "/grade", b"jpg", {"Content-Length": length})
+    assert status == 400 and "Content-Length" in payload["error"]
+
+
+def test_non_dict_json_image_is_400(server):
+    body = json.dumps({"images": ["abc", 1]}).encode()
+    status, _ = _post(server, "/batch", body, {"Content-Type": "application/json", "Content-Length": str(len(body))})
+    assert status == 400
+
+
+def test_valid_batch_is_graded(server):
+    body = json.dumps({"images": [{"name": n, "data": ""} for n in ("ana", "ben")]}).encode()
+    status, payload = _post(server, "/batch", body, {"Content-Type": "application/json", "Content-Length": str(len(body))})
+    assert status == 200 and [s["name"] for s in payload["sheets"]] == ["ana", "ben"]
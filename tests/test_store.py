@@ -0,0 +1,55 @@
+# tests/test_store.py
+import pytest
+
+from omr.store import ResultStore, open_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    # few distinct scores and names, so every page boundary falls inside a tie
+    rows = [(f"student{i % 3}", {1: "A"}, float(i % 2), 1) for i in range(200)]
+    store.insert_many(rows[:100], "exam")
+    store.insert_many(rows[100:], "other")
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("order_by, column", [("score", 3), ("student", 1), ("scanned_at", 5)])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("exam", [None, "exam"])
+def test_ties_are_ordered_by_id(store, order_by, column, descending, exam):
+    rows = store.query(exam=exam, order_by=order_by, descending=descending)
+    keys = [(row[column], row[0]) for row in rows]
+    assert keys == sorted(keys, reverse=descending)
+
+
+@pytest.mark.parametrize("order_by", ["score", "student"])
+def test_paging_over_ties_returns_every_row_once(store, order_by):
+    seen = []
+    for offset in range(0, 100, 7):
+        seen += [row[0] for row in store.query(exam="exam", order_by=order_by, limit=7, offset=offset)]
+    assert len(seen) == 100 and len(set(seen)) == 100
+
+
+def _legacy_csv(path):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text("Student Name,Answers,Score,Total\nana,{1: 'A'},1,1\n", encoding="utf-8")
+
+
+def test_only_the_default_database_imports_the_legacy_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _legacy_csv(tmp_path / "results" / "results.csv")
+    with open_store(str(tmp_path / "other.db")) as store:
+        assert store.query() == []
+    with open_store() as store:
+        assert [row[1] for row in store.query()] == ["ana"]
+
+
+def test_explicit_legacy_csv_is_imported_once(tmp_path):
+    csv_path = tmp_path / "old" / "results.csv"
+    _legacy_csv(csv_path)
+    db = str(tmp_path / "other.db")
+    for _ in range(2):
+        with open_store(db, legacy_csv=str(csv_path)) as store:
+            assert len(store.query()) == 1
@@ -0,0 +1,78 @@
+# tests/test_voting.py
+import threading
+import time
+
+import numpy as np
+
+from omr import live
+from omr.live import LiveScanner
+from omr.processor import ScanResult
+from omr.voting import FrameVoter
+
+
+def _frame(answers=(0, 1, 2), shift=0.0):
+    fill = np.zeros((len(answers), 4), np.int32)
+    fill[np.arange(len(answers)), answers] = 900
+    corners = np.float32([[[10, 10]], [[590, 10]], [[10, 390]], [[590, 390]]]) + shift
+    return ScanResult(found=True, answers=list(answers), q_nos=[1, 2, 3], fill=fill, corners=corners)
+
+
+def _frames_until_ready(voter, frame, limit=30):
+    for n in range(1, limit + 1):
+        if voter.add(frame).ready:
+            return n
+    return None
+
+
+def test_recorded_sheet_still_in_view_is_not_ready_again():
+    voter = FrameVoter()
+    assert _frames_until_ready(voter, _frame()) == voter.stable_frames
+    voter.hold()
+    assert _frames_until_ready(voter, _frame((3, 3, 3))) is None  # same corners: still the recorded sheet
+
+
+def test_hold_ends_when_the_sheet_leaves():
+    voter = FrameVoter()
+    _frames_until_ready(voter, _frame())
+    voter.hold()
+    for _ in range(voter.max_gap):
+        voter.add(ScanResult())
+    assert _frames_until_ready(voter, _frame((3, 3, 3))) == voter.stable_frames
+
+
+def test_hold_ends_when_the_sheet_moves():
+    voter = FrameVoter()
+    _frames_until_ready(voter, _frame())
+    voter.hold()
+    voter.add(_frame())
+    assert _frames_until_ready(voter, _frame((3, 3, 3), shift=2 * voter.max_motion)) == voter.stable_frames
+    assert voter.vote().result.answers == [3, 3, 3]  # nothing from before the move
+
+
+def test_frames_captured_before_reset_are_not_voted(monkeypatch):
+    monkeypatch.setattr(live, "scan_frame", lambda frame, *args, **kwargs: (frame, _frame()))
+    scanner = LiveScanner({1: 0}, track=False, voter=FrameVoter())
+    before = time.perf_counter()
+    scanner.reset()
+    thread = threading.Thread(target=scanner._process_loop, daemon=True)
+    thread.start()
+    try:
+        frame = np.zeros((4, 4, 3), np.uint8)
+        scanner.frames.put((before, frame))
+        _, _, _, vote = _next_result(scanner)
+        assert vote is None and not scanner.voter.frames
+        scanner.frames.put((time.perf_counter(), frame))
+        _, _, _, vote = _next_result(scanner)
+        assert vote is not None and vote.frames == 1
+    finally:
+        scanner._stop.set()
+        thread.join(timeout=2)
+
+
+def _next_result(scanner, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        got = scanner.latest()
+        if got is not None:
+            return got
+    raise AssertionError("no frame processed")
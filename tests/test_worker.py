@@ -0,0 +1,48 @@
+# tests/test_worker.py
+import csv
+import json
+import threading
+
+import cv2
+import numpy as np
+
+from omr.batch import run_batch
+from omr.layout import BubbleLayout
+from student.worker import ScanWorker
+
+
+def test_camera_scans_use_the_printed_layout(tmp_path):
+    layout_path = tmp_path / "layout.json"
+    layout_path.write_text(json.dumps([{"printed_index": 1, "original_q_no": 7,
+                                        "options": {"A": [70, 100, 20, 20], "B": [240, 100, 20, 20]}}]))
+    worker = ScanWorker(layout_path=str(layout_path))
+    try:
+        layout = worker._current_layout()
+        assert isinstance(layout, BubbleLayout) and layout.q_nos == [7]
+        assert worker._layout_path() == str(layout_path)
+    finally:
+        worker.stop()
+
+
+def test_camera_scans_without_a_layout_file(tmp_path):
+    worker = ScanWorker(layout_path=str(tmp_path / "missing.json"))
+    try:
+        assert worker._current_layout() is None and worker._layout_path() is None
+    finally:
+        worker.stop()
+
+
+def test_spawned_batch_from_a_thread(tmp_path):
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / f"s{i}.png")
+        cv2.imwrite(path, np.full((400, 600), 255, np.uint8))
+        paths.append(path)
+    out = str(tmp_path / "out.csv")
+    thread = threading.Thread(target=run_batch, args=(paths, {1: 0}, out),
+                              kwargs={"workers": 2, "start_method": "spawn"})
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+    with open(out, newline="", encoding="utf-8") as f:
+        assert len(list(csv.reader(f))) == 5